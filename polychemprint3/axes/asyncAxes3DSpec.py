@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Specifies coroutine (asyncio) counterparts of the Axes3DSpec methods.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+
+from polychemprint3.utility.asyncDeviceSpec import asyncDeviceSpec
+
+
+class asyncAxes3DSpec(asyncDeviceSpec):
+    """Abstract Base Class for the asyncio interface of 3D Axes.
+
+    By default each method runs its blocking Axes3DSpec twin in the axes'
+    worker thread, drivers with a non-blocking transport override them.
+    """
+
+    async def activateAsync(self):
+        """*Makes required connections and returns status bool*.
+
+        Returns
+        -------
+        bool
+            True if ready to use
+            False if not ready
+        """
+        return await self.runBlocking(self.activate)
+
+    async def deactivateAsync(self):
+        """*Closes communication and returns status bool*.
+
+        Returns
+        -------
+        bool
+            True if closed succesfully
+            False if failed
+        """
+        return await self.runBlocking(self.deactivate)
+
+    async def setPosModeAsync(self, newPosMode):
+        """*Sets positioning mode to relative or absolute*.
+
+        Parameters
+        ----------
+        newPosMode: String
+            Positioning mode to use for future move cmds
+        """
+        return await self.runBlocking(self.setPosMode, newPosMode)
+
+    async def moveAsync(self, gcodeString):
+        """*Moves to the specified gcodeString position*.
+
+        Parameters
+        ----------
+        gCodeString: String
+            Motion command in terms of Gcode G0/G1/G2/G3 supported
+        """
+        return await self.runBlocking(self.move, gcodeString)
+
+    async def sendCmdAsync(self, command):
+        """*Writes command to axes device when ready*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+        """
+        return await self.runBlocking(self.sendCmd, command)
+
+    async def pollAsync(self, command):
+        """*Sends message to axes and returns response*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Return
+        ------
+        String
+            Response from axes
+        """
+        return await self.runBlocking(self.poll, command)
+
+    async def getAbsPosXYAsync(self):
+        """*Gets the current position (absolute) and return XY positions*.
+
+        Returns
+        -------
+        String
+            [X, Y] X and Y positions as strings
+        """
+        return await self.runBlocking(self.getAbsPosXY)
+
+    async def setPosZeroAsync(self):
+        """*Sets the current position (absolute) to (0,0,0)*.
+        """
+        return await self.runBlocking(self.setPosZero)
+
+    async def waitMotionDoneAsync(self):
+        """*Waits until all commanded motion has physically finished*.
+        """
+        return await self.runBlocking(self.waitMotionDone)
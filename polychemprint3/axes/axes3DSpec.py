@@ -10,9 +10,10 @@ Specifies 3D Axes classes, implementations are for specific printers/stages.
 
 from abc import ABC, abstractmethod
 from polychemprint3.utility.loggerSpec import loggerSpec
+from polychemprint3.axes.asyncAxes3DSpec import asyncAxes3DSpec
 
 
-class Axes3DSpec(loggerSpec, ABC):
+class Axes3DSpec(loggerSpec, asyncAxes3DSpec, ABC):
     """Abstract Base Class for 3D Axes."""
 
     @abstractmethod
@@ -125,4 +126,66 @@ class Axes3DSpec(loggerSpec, ABC):
     def setPosZero(self):
         """*Sets the current position (absolute) to (0,0,0)*.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def setStreamMode(self, doStream):
+        """*Turns streaming of move commands on or off, if supported*.
+
+        Streamed moves are sent without waiting for each to be
+        acknowledged, see waitMotionDone for synchronizing with them.
+
+        Parameters
+        ----------
+        doStream: bool
+            True to stream moves, False to wait for each one
+
+        Returns
+        -------
+        bool
+            previous stream mode, always False if streaming is not supported
+        """
+        return False
+
+    def setWriteBatching(self, doBatch):
+        """*Turns batching of consecutive command writes on or off*.
+
+        Batched commands are sent together at the next sync point.
+
+        Parameters
+        ----------
+        doBatch: bool
+            True to collect writes, False to write each command immediately
+
+        Returns
+        -------
+        bool
+            previous batching mode, always False if not supported
+        """
+        return False
+
+    def discardWrites(self):
+        """*Drops batched commands not yet sent, if supported*.
+
+        Called when a running sequence is interrupted, so queued moves are
+        not sent after the abort.
+
+        Returns
+        -------
+        int
+            number of bytes dropped
+        """
+        return 0
+
+    def waitMotionDone(self):
+        """*Blocks until all commanded motion has physically finished*.
+
+        Used as a synchronization point before tool actions and pauses.
+        """
+        pass
+
+    def abortMotion(self):
+        """*Stops commanded motion and drops queued moves, if supported*.
+
+        Called when a running sequence is interrupted.
+        """
+        pass
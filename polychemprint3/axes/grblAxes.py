@@ -0,0 +1,671 @@
+# -*- coding: utf-8 -*-
+"""
+Implements axes3DSpec for stages running GRBL (v1.1) firmware.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+import serial
+import time
+import re
+import logging
+from colorama import Fore, Style
+from polychemprint3.utility.asyncSerialDeviceSpec import asyncSerialDeviceSpec
+from polychemprint3.utility import serialRegistry
+from polychemprint3.axes.axes3DSpec import Axes3DSpec
+
+
+class grblAxes(asyncSerialDeviceSpec, Axes3DSpec):
+    """Implemented interface for GRBL motion controllers.
+
+    Commands are streamed with GRBL's character-counting flow control: as
+    many lines are sent as fit in the controller's serial RX buffer, each
+    "ok"/"error" frees the bytes of the oldest line. Status is read with the
+    real-time '?' query, feed hold/resume use the real-time '!' and '~'.
+    Replies are always read by the background reader thread.
+    """
+
+    def __init__(self,
+                 name='grblAxes',
+                 posMode='relative',
+                 devAddress="/dev/ttyUSB0",
+                 baudRate=None,
+                 commsTimeOut=0.5,
+                 __verbose__=1,
+                 firmwareVers='1.1',
+                 streamMode=True,
+                 rxBufferSize=128,
+                 connectTimeOut=10):
+        """*Initializes object with default params DOESNT ACTIVATE*.
+
+        Parameters
+        ----------
+        name: String
+            name of stage
+        devAddress: String
+            location of serial device for communication
+        baudRate: String
+            baudrate for serial communication, None for the saved/default rate
+        commsTimeout: float
+            how long to wait for a status report
+        firmwareVers: String
+            GRBL version to validate against in handshake
+        __verbose__: bool
+            whether details should be printed to cmd line
+        posMode: String
+            Current active positioning mode, relative or absolute
+        streamMode: bool
+            whether move commands are streamed (character counting) instead
+            of waiting for each "ok" before sending the next command
+        rxBufferSize: int
+            size in bytes of the GRBL serial RX buffer
+        connectTimeOut: float
+            max seconds to wait for GRBL to boot/answer on connect
+        """
+        self.firmwareVers = firmwareVers
+        self.streamMode = streamMode
+        self.rxBufferSize = rxBufferSize
+        self.connectTimeOut = connectTimeOut
+        self.pendingAcks = []  # [cmdBytes, command] awaiting "ok"/"error"
+        self.status = {}  # latest real-time status report
+        self.wco = {'X': 0.0, 'Y': 0.0, 'Z': 0.0}  # work coordinate offset
+        kwargs = {'name': name,
+                  'posMode': posMode,
+                  'devAddress': devAddress,
+                  'baudRate': baudRate,
+                  'commsTimeOut': commsTimeOut,
+                  '__verbose__': __verbose__}
+        super().__init__(**kwargs)
+
+    #########################################################################
+    # Axes3DSpecMethods
+    #########################################################################
+    def activate(self):
+        """*Makes required connections and returns status bool*.
+
+        Returns
+        -------
+        bool
+            True if ready to use
+            False if not ready
+        """
+        passed = False
+        # Start Serial Device
+        [status, message] = self.startSerial()
+        print("\t\t\t" + message)
+        if status == 1:
+            # Try initial handshake
+            [hshake, hmessage] = self.handShakeSerial()
+            print("\t\t\t" + hmessage)
+            if hshake == 1:
+                self.setPosMode(self.posMode)
+                passed = True
+
+        return passed
+
+    def deactivate(self):
+        """*Closes communication and returns status bool*.
+
+        Returns
+        -------
+        bool
+            True if closed succesfully
+            False if failed
+        """
+        passed = False
+        # Stop Serial Device
+        [status, message] = self.stopSerial()
+        print("\t\t\t" + message)
+        if status == 1:
+            passed = True
+
+        return passed
+
+    def setPosMode(self, newPosMode):
+        """*Sets positioning mode to relative or absolute*.
+
+        Parameters
+        ----------
+        newPosMode: String
+            Positioning mode to use for future move cmds
+        """
+        try:
+            if newPosMode == 'relative':
+                self.writeReady("G91\n")
+                self.posMode = newPosMode
+            elif newPosMode == 'absolute':
+                self.writeReady("G90\n")
+                self.posMode = newPosMode
+            else:
+                print("Error setting position mode to axes")
+
+        except Exception as inst:
+            logging.exception(inst)
+            print("Error setting position mode to axes")
+
+    def move(self, gcodeString):
+        """*Moves axes by set amount*.
+
+        Parameters
+        ----------
+        gCodeString: String
+            Motion command in terms of Gcode G0/G1/G2/G3 supported
+        """
+        if self.streamMode:
+            self.writeStreamed(gcodeString)
+        else:
+            self.writeReady(gcodeString)
+
+    def sendCmd(self, command):
+        """*Writes command to axes device when ready*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            Response from axes
+        """
+        return self.writeReady(command)
+
+    def poll(self, command):
+        """*Sends message to axes and returns response*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Return
+        ------
+        String
+            Response from axes
+        """
+        return self.writeReady(command)
+
+    def getAbsPosXY(self):
+        """*Gets the current position (work coordinates), XY positions*.
+
+        Uses the real-time status query, so streamed moves are not waited
+        for and the position is where the stage is right now.
+
+        Returns
+        -------
+        String
+            [X, Y] X and Y positions as strings
+        """
+        position = self.getStatus().get('position', {})
+        return ["%.3f" % position.get('X', 0.0),
+                "%.3f" % position.get('Y', 0.0)]
+
+    def setPosZero(self):
+        """*Sets current axes position to absolute (0,0,0)*.
+        """
+        self.writeReady('G92 X0 Y0 Z0\n')
+
+    def setStreamMode(self, doStream):
+        """*Turns character-counting streaming of moves on or off*.
+
+        Parameters
+        ----------
+        doStream: bool
+            True to stream moves, False to wait for "ok" after each one
+
+        Returns
+        -------
+        bool
+            previous stream mode
+        """
+        wasStreaming = self.streamMode
+        if not doStream:
+            self.flushStream()
+        self.streamMode = doStream
+        return wasStreaming
+
+    def waitMotionDone(self):
+        """*Blocks until every streamed move has been executed*.
+
+        GRBL answers a dwell only once its planner buffer is empty.
+
+        Returns
+        -------
+        String
+            All text read in
+        """
+        return self.writeReady("G4 P0\n")
+
+    def abortMotion(self):
+        """*Stops motion and drops every queued command (soft reset)*.
+
+        A feed hold first brings the axes to a controlled stop, so the soft
+        reset that clears GRBL's buffers keeps the position (no alarm).
+        """
+        self.writeRealTime('!')
+        tEnd = time.time() + self.connectTimeOut
+        while time.time() < tEnd:
+            state = self.getStatus().get('state', '')
+            if state in ['Idle', 'Hold:0'] or state.startswith('Alarm'):
+                break
+        self.writeRealTime('\x18')
+        self.pendingAcks = []
+        self.waitBoot()
+        print(Fore.LIGHTYELLOW_EX + "\t\t\tAxes stopped, queued moves dropped"
+              + Style.RESET_ALL)
+
+    #########################################################################
+    # SerialDevice Methods
+    #########################################################################
+    def startSerial(self):
+        """*Opens (or reuses the already open) serial port*.
+
+        Returns
+        -------
+        [1, "Serial Device Started successfully"]
+            started succesfully
+        [-1, 'Failed Creating pySerial...']
+            could not start
+        """
+        if self.checkIfSerialConnectParamsSet():
+            # Try to connect, catch errors and return to user
+            try:
+                [self.ser, isNew] = serialRegistry.acquirePort(
+                    self, self.devAddress, baudrate=self.baudRate,
+                    timeout=0.1)
+                self.pendingAcks = []
+                self.status = {}
+                self.ser.reset_input_buffer()
+                self.startReader()
+                if isNew:
+                    print("\t\t\tWaiting for GRBL to initialize...")
+                    [ready, waited] = self.waitBoot()
+                else:
+                    [ready, waited] = [self.getStatus() != {}, 0.0]
+                if ready:
+                    return [1, "Serial Device Started successfully in "
+                            + "%.1f s" % waited]
+                return [1, "Serial Device Started, no response from GRBL "
+                        + "after %.1f s" % waited]
+            except Exception as inst:
+                self.closeFailedPort()
+                return [-1, 'Failed Creating pySerial... ' + inst.__str__()]
+
+        else:  # Not all params were set
+            return [0, 'Not all connection parameters set']
+
+    def stopSerial(self):
+        """*Stops communication, the port is kept open for reactivation*.
+
+        Returns
+        -------
+        [1, "Terminated successfully"]
+            started succesfully
+        [-1, "Error: Serial Device could not be stopped + error text"]
+        """
+        try:
+            self.stopReader()
+            serialRegistry.releasePort(self, self.devAddress)
+            return [1, "Terminated successfully"]
+        except Exception as inst:
+            return [-1, "Error: Serial Device could not be stopped "
+                    + inst.__str__()]
+
+    def handShakeSerial(self):
+        """*Perform communications handshake with serial device*.
+
+        Returns
+        -------
+        [1, "Handshake Successful"]
+            success occured
+        [0, 'Handshake Failed, Rcvd + message received']
+            failure occured
+        [-1, "Error: Handshake with Tool Failed + error text"]
+            Error received
+        """
+        try:
+            readInput = self.sendCmd("$I\n")
+            version = re.search(r'\[VER:([^\]:]*)', readInput)
+            if version is None or self.firmwareVers not in version.group(1):
+                return [-1, 'Handshake Failed: Wrong Firmware Version, Rcvd: '
+                        + readInput]
+            state = self.getStatus().get('state', '')
+            if state.startswith('Alarm'):
+                return [1, 'Handshake Success, GRBL in alarm state, '
+                        + 'home or unlock ($X) before moving']
+            return [1, 'Handshake Success']
+        except Exception as inst:
+            logging.exception(inst)
+            return [-1, 'Error on Handshake: ' + inst.__str__()]
+
+    def __writeSerial__(self, command):
+        """*Writes text to serial device*.
+
+        Parameters
+        ----------
+        text: String
+            message to send
+
+        Returns
+        -------
+        [1, 'Text Sent + text']
+            succesfull 2-way communication
+        [-1, 'Write Failed + Error']
+            Exception caught
+        """
+        try:
+            self.writeBytes(command.encode('utf-8'))
+            if self.__verbose__:
+                print('\t\t\tCommand Sent:> ' + command.rstrip())
+            return [1, 'Command Sent' + command]
+        except Exception as inst:
+            return [-1, 'Error on Write: ' + inst.__str__()]
+
+    def readTime(self, timeout=None):
+        """*Reads in messages until none arrives within timeout*.
+
+        Parameters
+        ----------
+        timeout: float
+            seconds of silence that end the read, default commsTimeOut
+
+        Returns
+        -------
+        String
+            All text read in, empty string if nothing
+        """
+        if timeout is None:
+            timeout = self.commsTimeOut
+        inp = ''
+        ins = self.waitMessage(timeout=timeout)[1]
+        while ins != "":
+            inp += ins
+            ins = self.waitMessage(timeout=timeout)[1]
+        return inp
+
+    def classifyMessage(self, msg):
+        """*Sorts GRBL replies into message kinds for the reader thread*.
+
+        Parameters
+        ----------
+        msg: String
+            line read in
+
+        Returns
+        -------
+        String
+            'ok', 'error', 'alarm', 'status', 'feedback', 'banner' or
+            'other'
+        """
+        if msg.startswith('ok'):
+            return 'ok'
+        elif msg.startswith('error:'):
+            return 'error'
+        elif msg.startswith('ALARM:'):
+            return 'alarm'
+        elif msg.startswith('<'):
+            return 'status'
+        elif msg.startswith('['):
+            return 'feedback'
+        elif msg.startswith('Grbl '):
+            return 'banner'
+        return 'other'
+
+    def handleMessage(self, kind, msg):
+        """*Keeps the status snapshot up to date from status reports*.
+
+        Parameters
+        ----------
+        kind: String
+            message kind from classifyMessage
+        msg: String
+            line read in
+        """
+        if kind == 'status':
+            fields = msg.strip('<>').split('|')
+            status = {'state': fields[0], 'time': time.time()}
+            machinePos = None
+            workPos = None
+            for field in fields[1:]:
+                [key, sep, value] = field.partition(':')
+                if key in ['MPos', 'WPos', 'WCO']:
+                    values = dict(zip('XYZ', [float(v)
+                                              for v in value.split(',')]))
+                    if key == 'MPos':
+                        machinePos = values
+                    elif key == 'WPos':
+                        workPos = values
+                    else:
+                        self.wco = values
+                elif key == 'FS':
+                    [feed, spindle] = value.split(',')[:2]
+                    status['feed'] = float(feed)
+                    status['spindle'] = float(spindle)
+                elif key == 'Bf':
+                    [blocks, rxBytes] = value.split(',')
+                    status['plannerFree'] = int(blocks)
+                    status['rxFree'] = int(rxBytes)
+            if workPos is None and machinePos is not None:
+                workPos = {axis: machinePos[axis] - self.wco.get(axis, 0.0)
+                           for axis in machinePos}
+            if machinePos is None and workPos is not None:
+                machinePos = {axis: workPos[axis] + self.wco.get(axis, 0.0)
+                              for axis in workPos}
+            status['position'] = workPos
+            status['machinePosition'] = machinePos
+            # Replaced whole so readers never see a half-updated snapshot
+            self.status = status
+        elif kind == 'alarm':
+            print(Fore.LIGHTRED_EX + "\t\t\tGRBL " + msg + Style.RESET_ALL)
+
+    #########################################################################
+    # Unique Methods
+    #########################################################################
+    def waitBoot(self):
+        """*Waits until GRBL has booted and answers, or timeout*.
+
+        Watches for the "Grbl 1.1x" banner printed on reset. If the port
+        stays silent (board did not reset on open) a status query is sent.
+
+        Returns
+        -------
+        [bool, float]
+            whether GRBL was detected, seconds waited
+        """
+        tStart = time.time()
+        tEnd = tStart + self.connectTimeOut
+        while time.time() < tEnd:
+            [kind, msg] = self.waitMessage(
+                kinds=['banner', 'status'],
+                timeout=max(0.0, min(0.5, tEnd - time.time())))
+            if kind is not None:
+                self.readTime(0.1)  # rest of the boot messages
+                self.clearMessages()
+                return [True, time.time() - tStart]
+            self.writeRealTime('?')
+        return [False, time.time() - tStart]
+
+    def writeRealTime(self, char):
+        """*Sends a real-time command character (?, !, ~, 0x18)*.
+
+        Real-time characters bypass GRBL's RX buffer and are not answered
+        with "ok", so they are never counted as in flight.
+
+        Parameters
+        ----------
+        char: String
+            single real-time command character
+        """
+        self.ser.write(char.encode('utf-8'))
+
+    def getStatus(self):
+        """*Queries GRBL's real-time status report*.
+
+        Returns
+        -------
+        dict
+            'state' (Idle, Run, Hold:0, Alarm...), 'position' and
+            'machinePosition' ({axis: value}), 'feed', 'spindle' and, if
+            enabled in GRBL, 'plannerFree'/'rxFree'; the last known status
+            if GRBL does not answer within commsTimeOut
+        """
+        self.clearMessages(['status'])
+        self.writeRealTime('?')
+        self.waitMessage(kinds=['status'], timeout=self.commsTimeOut)
+        return dict(self.status)
+
+    def waitReady(self):
+        """*Waits for the "ok"/"error" of the oldest command in flight*.
+
+        Returns
+        -------
+        String
+            Reply read in
+        """
+        i = 0  # loop increments
+        while True:
+            [kind, inp] = self.waitMessage(kinds=['ok', 'error'],
+                                           timeout=0.5)
+            if kind is not None:
+                break
+            if not self.isReaderRunning():
+                raise serial.SerialException("GRBL reader stopped")
+            i += 1
+            if i % 10 == 0 and self.__verbose__:
+                print(Fore.LIGHTYELLOW_EX
+                      + "\t\t\tWaiting for Axes to acknowledge "
+                      + "last command" + Style.RESET_ALL)
+        if self.__verbose__:
+            print("\t\t\tRcvd:< " + inp)
+        if self.pendingAcks:
+            [cmdBytes, command] = self.pendingAcks.pop(0)
+            if kind == 'error':
+                print(Fore.LIGHTRED_EX + "\t\t\tGRBL " + inp + " on: "
+                      + command.rstrip() + Style.RESET_ALL)
+        return inp
+
+    def writeReady(self, command):
+        """*Sends command once the stream is drained, waits for its reply*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            All text read in, including feedback messages ([...])
+        """
+        self.flushStream()
+        self.clearMessages(['feedback', 'other'])
+        self.sendTracked(command)
+        reply = self.waitReady()
+        allIn = ""
+        [kind, msg] = self.popMessage(['feedback', 'other'])
+        while kind is not None:
+            allIn += msg + "\n"
+            [kind, msg] = self.popMessage(['feedback', 'other'])
+        return allIn + reply
+
+    def writeStreamed(self, command):
+        """*Sends command as soon as GRBL's RX buffer has room for it*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            Replies read in while waiting for room
+        """
+        line = self.formatLine(command)
+        allIn = ""
+        budget = self.rxBufferSize - 1
+        if self.pendingAcks and self.calcBytesInFlight() + len(line) > budget:
+            if self.writeBatching:
+                # Drain to half so the refill goes out as one write
+                budget = self.rxBufferSize // 2
+            while (self.pendingAcks
+                   and self.calcBytesInFlight() + len(line) > budget):
+                allIn += self.waitReady()
+        self.sendTracked(line)
+        return allIn
+
+    def flushStream(self):
+        """*Blocks until every streamed command has been acknowledged*.
+
+        Returns
+        -------
+        String
+            All text read in while draining
+        """
+        allIn = ""
+        while self.pendingAcks:
+            allIn += self.waitReady()
+        return allIn
+
+    def discardWrites(self):
+        """*Drops batched commands not yet sent and forgets them*.
+
+        Returns
+        -------
+        int
+            number of bytes dropped
+        """
+        dropped = super().discardWrites()
+        unsentBytes = 0
+        while unsentBytes < dropped and self.pendingAcks:
+            unsentBytes += self.pendingAcks.pop()[0]
+        return dropped
+
+    def sendTracked(self, command):
+        """*Writes command and records its bytes as in flight*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        [1, 'Text Sent + text']
+            succesfull 2-way communication
+        [-1, 'Write Failed + Error']
+            Exception caught
+        """
+        line = self.formatLine(command)
+        [status, message] = self.__writeSerial__(line)
+        if status == 1:
+            self.pendingAcks.append([len(line.encode('utf-8')), line])
+        return [status, message]
+
+    def formatLine(self, command):
+        """*Strips comments/whitespace GRBL would drop and ends the line*.
+
+        Parameters
+        ----------
+        command: String
+            G-code line
+
+        Returns
+        -------
+        String
+            line as sent, newline terminated
+        """
+        return command.split(';')[0].strip() + "\n"
+
+    def calcBytesInFlight(self):
+        """*Returns the number of sent bytes still in GRBL's RX buffer*.
+
+        Returns
+        -------
+        int
+            bytes in flight
+        """
+        return sum(cmdBytes for [cmdBytes, command] in self.pendingAcks)
@@ -7,26 +7,40 @@ Implements axes3DSpec for lulzbot taz 6 with modified firmware.
 | Author: Bijal Patel
 
 """
-import serial
 import time
+import re
+from collections import deque
 from colorama import Fore, Style
-from polychemprint3.utility.serialDeviceSpec import serialDeviceSpec
+from polychemprint3.utility.asyncSerialDeviceSpec import asyncSerialDeviceSpec
+from polychemprint3.utility import serialRegistry
 from polychemprint3.axes.axes3DSpec import Axes3DSpec
 import logging
 import textwrap
 
 
-class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
-    """Implemented interface for Lulzbot Taz 6 with BP modified firmware."""
+class lulzbotTaz6_BP(asyncSerialDeviceSpec, Axes3DSpec):
+    """Implemented interface for Lulzbot Taz 6 with BP modified firmware.
+
+    The *Async methods await replies natively while the background reader
+    is running (useReaderThread), otherwise they run in a worker thread.
+    """
 
     def __init__(self,
                  name='LulzbotTaz6',
                  posMode='relative',
                  devAddress="/dev/ttyACM0",
-                 baudRate=115200,
+                 baudRate=None,
                  commsTimeOut=0.001,
                  __verbose__=1,
-                 firmwareVers='BP'):
+                 firmwareVers='BP',
+                 streamMode=False,
+                 streamDepth=4,
+                 rxBufferSize=127,
+                 lineNumbering=False,
+                 resendHistory=64,
+                 resendTimeOut=5,
+                 useReaderThread=False,
+                 connectTimeOut=10):
         """*Initializes object with default params DOESNT ACTIVATE*.
 
         Parameters
@@ -36,7 +50,7 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
         devAddress: String
             location of serial device for communication
         baudRate: String
-            baudrate for serial communication
+            baudrate for serial communication, None for the saved/default rate
         commsTimeout: int
             how long to wait for serial device
         firmwareVers: String
@@ -47,8 +61,47 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
             whether details should be printed to cmd line
         posMode: String
             Current active positioning mode, relative or absolute
+        streamMode: bool
+            whether move commands are streamed (sliding window) instead of
+            waiting for each "ok" before sending the next command
+        streamDepth: int
+            max number of streamed commands awaiting an "ok" (planner budget)
+        rxBufferSize: int
+            max number of bytes in flight to the firmware serial RX buffer
+        lineNumbering: bool
+            whether commands are sent as N<line> ... *<checksum> so the
+            firmware can request a resend of corrupted lines
+        resendHistory: int
+            number of recently sent lines kept for answering resend requests
+        resendTimeOut: float
+            seconds without any "ok" or resend request, while numbered lines
+            await their "ok", before they are resent unasked (0 disables)
+        useReaderThread: bool
+            whether replies are read by a background thread and sorted into
+            message queues instead of being read by the calling thread
+        connectTimeOut: float
+            max seconds to wait for the printer to boot/answer on connect
         """
         self.firmwareVers = firmwareVers
+        self.streamMode = streamMode
+        self.streamDepth = streamDepth
+        self.rxBufferSize = rxBufferSize
+        self.pendingAcks = []  # [lineNum, cmdBytes] of cmds awaiting "ok"
+        self.lineNumbering = lineNumbering
+        self.lineNumber = 0  # last line number sent
+        self.sentLines = deque(maxlen=resendHistory)  # [lineNum, framedLine]
+        self.skipAcks = 0  # "ok"s owed to rejected lines, not to commands
+        self.resendTimeOut = resendTimeOut
+        self.resendLine = 0  # last line number resent from
+        self.resendDups = 0  # duplicate resend requests still expected
+        self.resendDupsUntil = 0.0  # time.time() after which none are
+        self.lastProgress = 0.0  # time.time() of the last send/"ok"/resend
+        self.useReaderThread = useReaderThread
+        self.connectTimeOut = connectTimeOut
+        self.absPos = {'X': 0.0, 'Y': 0.0, 'Z': 0.0}  # software position
+        self.posKnown = False  # absPos matches the printer
+        self.autoReport = 0  # seconds between firmware status reports
+        self.status = {}  # latest firmware reported position/temperatures
         kwargs = {'name': name,
                   'posMode': posMode,
                   'devAddress': devAddress,
@@ -78,6 +131,11 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
             [hshake, hmessage] = self.handShakeSerial()
             print("\t\t\t" + hmessage)
             if hshake == 1:
+                # Firmware keeps its mode/position over warm reconnects,
+                # sync both once so moves can be tracked in software
+                self.setPosMode(self.posMode)
+                [rstatus, rmessage] = self.resyncPos()
+                print("\t\t\t" + rmessage)
                 passed = True
 
         return passed
@@ -133,7 +191,10 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
         | *Returns*
         |   none
         """
-        self.writeReady(gcodeString)
+        if self.streamMode:
+            self.writeStreamed(gcodeString)
+        else:
+            self.writeReady(gcodeString)
 
     def sendCmd(self, command):
         """*Writes command to axes device when ready*.
@@ -168,22 +229,17 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
     def getAbsPosXY(self):
         """*Gets the current position (absolute) and return XY positions*.
 
-        Parameters
-        ----------
-        command: String
-            Gcode to write to axes
+        Answered from the software position tracker, the printer is only
+        queried (M114) if the position is unknown, see resyncPos.
 
         Returns
         -------
         String
             [X, Y] X and Y positions as strings
         """
-        self.writeReady('M114\n')
-        m114Call = self.waitReady()
-        m114Split = m114Call.split(' ')
-        x = m114Split[0][2:]
-        y = m114Split[1][2:]
-        return [x, y]
+        if not self.posKnown:
+            self.resyncPos()
+        return ["%.2f" % self.absPos['X'], "%.2f" % self.absPos['Y']]
 
     def setPosZero(self):
         """*Sets current axes position to absolute (0,0,0)*.
@@ -193,7 +249,10 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
     # SerialDevice Methods
     #########################################################################
     def startSerial(self):
-        """*Creates pySerial device*.
+        """*Opens (or reuses the already open) serial port*.
+
+        A port kept open by serialRegistry skips the boot wait, the printer
+        did not reset.
 
         Returns
         -------
@@ -205,32 +264,48 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
         if self.checkIfSerialConnectParamsSet():
             # Try to connect, catch errors and return to user
             try:
-                self.ser = serial.Serial(port=self.devAddress,
-                                         baudrate=self.baudRate,
-                                         timeout=0.5)
+                [self.ser, isNew] = serialRegistry.acquirePort(
+                    self, self.devAddress, baudrate=self.baudRate,
+                    timeout=0.5)
+                self.pendingAcks = []
+                self.skipAcks = 0
+                self.posKnown = False
+                self.autoReport = 0
+                self.status = {}
 
                 # Use ser for read/write
 
                 # Clear initial garbage text in output buffer
                 self.ser.reset_output_buffer()
-                i = 1
-                while i < 10:
-                    time.sleep(1)
-                    print("\t\t\t(%d/10) Waiting for Printer to initialize..."
-                          % i)
-                    i += 1
+                if self.useReaderThread:
+                    self.startReader()
+                if isNew:
+                    print("\t\t\tWaiting for Printer to initialize...")
+                    [ready, waited] = self.waitBoot()
+                else:
+                    [ready, waited] = [True, 0.0]
                 print("\t\tInitial Read from Taz6: ")
                 # keep reading until empty
-                self.readTime()
-                return [1, "Serial Device Started successfully"]
+                self.readTime(0.25)
+                # Firmware keeps its line counter across warm reconnects
+                if self.lineNumbering:
+                    self.resetLineNumber()
+                if ready:
+                    return [1, "Serial Device Started successfully in "
+                            + "%.1f s" % waited]
+                return [1, "Serial Device Started, no response from printer "
+                        + "after %.1f s" % waited]
             except Exception as inst:
+                self.closeFailedPort()
                 return [-1, 'Failed Creating pySerial... ' + inst.__str__()]
 
         else:  # Not all params were set
             return [0, 'Not all connection parameters set']
 
     def stopSerial(self):
-        """*Closes serial devices*.
+        """*Stops communication, the port is kept open for reactivation*.
+
+        Use serialRegistry.closePort(devAddress) to really close it.
 
         Returns
         -------
@@ -239,11 +314,12 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
         [-1, "Error: Serial Device could not be stopped + error text"]
         """
         try:
-            self.ser.close()
-            self.sReader.close()
+            self.stopReader()
+            serialRegistry.releasePort(self, self.devAddress)
             return [1, "Terminated successfully"]
-        except Exception:
-            return [-1, "Error: Serial Device could not be stopped"]
+        except Exception as inst:
+            return [-1, "Error: Serial Device could not be stopped "
+                    + inst.__str__()]
 
     def handShakeSerial(self):
         """*Perform communications handshake with serial device*.
@@ -284,7 +360,11 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
             Exception caught
         """
         try:
-            self.ser.write(command.encode('utf-8'))
+            if self.lineNumbering:
+                self.lineNumber += 1
+                command = self.frameLine(command, self.lineNumber)
+                self.sentLines.append([self.lineNumber, command])
+            self.writeBytes(command.encode('utf-8'))
             if self.__verbose__:
                 print('\t\t\tCommand Sent:> ' + command.rstrip())
             return [1, 'Command Sent' + command]
@@ -292,31 +372,112 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
             return [-1, 'Error on Write: ' + inst.__str__()]
             print("writerror")
 
-    def readTime(self):
-        """*Reads in from serial device until timeout*.
+    def readTime(self, timeout=None):
+        """*Reads in from serial device until no line arrives within timeout*.
+
+        Each read blocks in the OS until a line or the deadline arrives.
+
+        Parameters
+        ----------
+        timeout: float
+            seconds of silence that end the read, default commsTimeOut
 
         Returns
         -------
         String
             All text read in, empty string if nothing
         """
+        if timeout is None:
+            timeout = self.commsTimeOut
         inp = ''  # input string
-        ins = ''  # read in
-        tEnd = time.time() + self.commsTimeOut
+        ins = self.readLine(timeout)
+        while ins != "":
+            inp += ins
+            ins = self.readLine(timeout)
+        return inp
+
+    def waitBoot(self):
+        """*Waits until the printer has booted and answers, or timeout*.
 
-        # Reads input until timeout
+        Watches for Marlin's "start" banner or an "ok". If the port stays
+        silent (board did not reset on open) an M115 probe is sent so warm
+        reconnects are ready as soon as the printer answers.
+
+        Returns
+        -------
+        [bool, float]
+            whether the printer was detected, seconds waited
+        """
+        tStart = time.time()
+        tEnd = tStart + self.connectTimeOut
+        tProbe = tStart + 0.25  # quiet this long -> board did not reset
         while time.time() < tEnd:
-            print(Fore.LIGHTYELLOW_EX
-                  + "\t\t\tWaiting on taz..." + Style.RESET_ALL)
-            ins = self.ser.readline().decode('utf-8').rstrip()
-            if ins != "":
-                if self.__verbose__:
-                    print(textwrap.fill("Rcvd:< " + ins, width=60,
-                                        initial_indent='\t\t\t',
-                                        subsequent_indent='\t\t\t'))
-                inp += ins
-                tEnd += self.commsTimeOut
-        return inp
+            ins = self.readLine(max(0.0, min(tProbe, tEnd) - time.time()))
+            if (ins.startswith('start') or ins.startswith('ok')
+                    or 'FIRMWARE_NAME' in ins):
+                return [True, time.time() - tStart]
+            elif ins != "":
+                tProbe = time.time() + 0.25  # still printing its banner
+            elif time.time() >= tProbe:
+                # Probe is sent unnumbered, probes lost while the bootloader
+                # runs are repeated
+                self.ser.write("M115\n".encode('utf-8'))
+                tProbe = time.time() + 2
+        return [False, time.time() - tStart]
+
+    def classifyMessage(self, msg):
+        """*Sorts Marlin replies into message kinds for the reader thread*.
+
+        Parameters
+        ----------
+        msg: String
+            line read in
+
+        Returns
+        -------
+        String
+            'ok', 'resend', 'error', 'echo', 'position', 'temperature'
+            or 'other'
+        """
+        if msg.startswith('ok'):
+            return 'ok'
+        elif re.match(r'(?:Resend:|rs)\s*N?\d+', msg):
+            return 'resend'
+        elif msg.startswith('Error:') or msg.startswith('!!'):
+            return 'error'
+        elif msg.startswith('echo:'):
+            return 'echo'
+        elif re.match(r'X:\s*-?[\d.]+\s+Y:', msg):
+            return 'position'
+        elif re.match(r'T\d?:\s*-?[\d.]+', msg):
+            return 'temperature'
+        return 'other'
+
+    def handleMessage(self, kind, msg):
+        """*Keeps the status snapshot up to date from position/temperature
+        reports*.
+
+        Parameters
+        ----------
+        kind: String
+            message kind from classifyMessage
+        msg: String
+            line read in
+        """
+        if kind == 'position':
+            values = dict(re.findall(r'([XYZE]):\s*(-?[\d.]+)',
+                                     msg.split('Count')[0]))
+            position = {axis: float(value) for axis, value in values.items()}
+            # Replaced whole so readers never see a half-updated snapshot
+            self.status = dict(self.status, position=position,
+                               positionTime=time.time())
+        elif kind == 'temperature':
+            temperatures = {}
+            for [heater, current, target] in re.findall(
+                    r'([TB]\d?):\s*(-?[\d.]+)\s*/\s*(-?[\d.]+)', msg):
+                temperatures[heater] = [float(current), float(target)]
+            self.status = dict(self.status, temperature=temperatures,
+                               temperatureTime=time.time())
 
     #########################################################################
     # Unique Methods
@@ -324,6 +485,9 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
     def waitReady(self):
         """*Looks for "ok" in input, waits indefinitely*.
 
+        Frees the stream slot of the oldest command awaiting an "ok" and
+        answers resend requests from the firmware along the way.
+
         Returns
         -------
         String
@@ -333,17 +497,49 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
         i = 0  # loop increments0
         allIn = ""
         while notReady:
-            inp = self.readTime()  # read buffer
-            if 'ok' in inp:
+            inp = self.readLine()  # read buffer
+            if self.processAck(inp):
                 notReady = False
             else:
-                if i % 10 == 0 and self.__verbose__:
-                    print(Fore.LIGHTYELLOW_EX
-                          + "\t\t\tWaiting for Axes to acknowledge "
-                          + "last command")
+                self.checkStalled()
+                if inp == "":
+                    # Duplicate resends arrive right after the first, if the
+                    # link has gone quiet any further request is a new error
+                    self.resendDups = 0
+                    i += 1
+                    if i % 10 == 0 and self.__verbose__:
+                        print(Fore.LIGHTYELLOW_EX
+                              + "\t\t\tWaiting for Axes to acknowledge "
+                              + "last command" + Style.RESET_ALL)
             allIn += inp
         return allIn
 
+    def processAck(self, inp):
+        """*Applies one received line to the "ok" bookkeeping*.
+
+        Parameters
+        ----------
+        inp: String
+            line received from the axes
+
+        Returns
+        -------
+        bool
+            True if inp is the "ok" for the oldest command awaiting one
+        """
+        if inp.startswith('ok'):
+            self.lastProgress = time.time()
+            if self.skipAcks > 0:  # "ok" belongs to a rejected line
+                self.skipAcks -= 1
+                return False
+            if self.pendingAcks:
+                self.pendingAcks.pop(0)
+            return True
+        # Busy keepalives show a long command is still running
+        if self.checkResend(inp) or inp.startswith('echo:busy'):
+            self.lastProgress = time.time()
+        return False
+
     def writeReady(self, command):
         """*Sends command only after rece0iving ok message*.
 
@@ -353,6 +549,664 @@ class lulzbotTaz6_BP(serialDeviceSpec, Axes3DSpec):
         | *Returns*
         |   inp, String read in
         """
-        self.__writeSerial__(command)
+        # Streamed commands must be acknowledged first, or their "ok"s would
+        # be mistaken for the response to this command
+        self.flushStream()
+        self.sendTracked(command)
         imp = self.waitReady()
         return imp
+
+    def sendTracked(self, command):
+        """*Writes command, records it as awaiting an "ok" and tracks it*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        [1, 'Text Sent + text']
+            succesfull 2-way communication
+        [-1, 'Write Failed + Error']
+            Exception caught
+        """
+        cmdBytes = self.calcSentBytes(command)
+        [status, message] = self.__writeSerial__(command)
+        if status == 1:
+            lineNum = self.lineNumber if self.lineNumbering else None
+            if not self.pendingAcks:
+                self.lastProgress = time.time()  # nothing was awaited
+            self.pendingAcks.append([lineNum, cmdBytes])
+            self.trackCommand(command)
+        return [status, message]
+
+    def trackCommand(self, command):
+        """*Updates the software position tracker for a command being sent*.
+
+        Handles G0-G3 moves in either positioning mode, G90/G91 and G92.
+        Homing (G28) makes the position unknown until the next resyncPos.
+
+        Parameters
+        ----------
+        command: String
+            command sent to axes
+        """
+        words = command.split(';')[0].upper().split()
+        if not words:
+            return
+        code = words[0]
+        values = {}
+        for word in words[1:]:
+            try:
+                values[word[0]] = float(word[1:])
+            except ValueError:
+                pass
+
+        if code in ['G0', 'G1', 'G2', 'G3', 'G00', 'G01', 'G02', 'G03']:
+            for axis in self.absPos:
+                if axis in values:
+                    if self.posMode == 'relative':
+                        self.absPos[axis] += values[axis]
+                    else:
+                        self.absPos[axis] = values[axis]
+        elif code == 'G90':
+            self.posMode = 'absolute'
+        elif code == 'G91':
+            self.posMode = 'relative'
+        elif code == 'G92':
+            for axis in self.absPos:
+                if axis in values or not values:
+                    self.absPos[axis] = values.get(axis, 0.0)
+        elif code == 'G28':
+            self.posKnown = False
+
+    def resyncPos(self):
+        """*Reads the position from the printer (M114) into the tracker*.
+
+        Waits for all streamed moves to be acknowledged first.
+
+        Returns
+        -------
+        [1, "Position resynced..."]
+            tracker updated
+        [-1, "Position resync failed..."]
+            no position report received
+        """
+        reply = self.writeReady('M114\n')
+        found = re.search(r'X:\s*(-?[\d.]+)\s+Y:\s*(-?[\d.]+)'
+                          + r'\s+Z:\s*(-?[\d.]+)', reply)
+        if found is None:
+            self.posKnown = False
+            return [-1, "Position resync failed, Rcvd: " + reply]
+        self.absPos = {'X': float(found.group(1)),
+                       'Y': float(found.group(2)),
+                       'Z': float(found.group(3))}
+        self.posKnown = True
+        return [1, "Position resynced: X%.2f Y%.2f Z%.2f"
+                % (self.absPos['X'], self.absPos['Y'], self.absPos['Z'])]
+
+    def calcSentBytes(self, command):
+        """*Returns how many bytes command occupies once sent*.
+
+        Parameters
+        ----------
+        command: String
+            command before any line number framing
+
+        Returns
+        -------
+        int
+            number of bytes written to the serial port
+        """
+        if self.lineNumbering:
+            return len(self.frameLine(command, self.lineNumber + 1))
+        return len(command.encode('utf-8'))
+
+    #########################################################################
+    # Streaming Methods
+    #########################################################################
+    def setStreamMode(self, doStream):
+        """*Turns sliding-window streaming of move commands on or off*.
+
+        Parameters
+        ----------
+        doStream: bool
+            True to stream moves, False to wait for "ok" after each one
+
+        Returns
+        -------
+        bool
+            previous stream mode
+        """
+        wasStreaming = self.streamMode
+        if not doStream:
+            self.flushStream()
+        self.streamMode = doStream
+        return wasStreaming
+
+    def waitMotionDone(self):
+        """*Blocks until every streamed move has been executed (M400)*.
+
+        An "ok" only means a move entered the planner, M400 is answered
+        once the planner is empty and the axes have stopped.
+
+        Returns
+        -------
+        String
+            All text read in
+        """
+        return self.writeReady("M400\n")
+
+    def writeStreamed(self, command):
+        """*Sends command as soon as the firmware has room for it*.
+
+        Keeps up to streamDepth commands (and rxBufferSize bytes) in flight
+        so the Marlin planner queue stays full, each "ok" frees one slot.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            Text read in while waiting for a free slot
+        """
+        cmdBytes = self.calcSentBytes(command)
+        allIn = ""
+        if self.isStreamFull(cmdBytes):
+            while self.isStreamFull(cmdBytes, draining=True):
+                allIn += self.waitReady()
+        self.sendTracked(command)
+        return allIn
+
+    def flushStream(self):
+        """*Blocks until every streamed command has been acknowledged*.
+
+        Returns
+        -------
+        String
+            All text read in while draining
+        """
+        allIn = ""
+        while self.pendingAcks:
+            allIn += self.waitReady()
+        return allIn
+
+    def discardWrites(self):
+        """*Drops batched commands not yet sent and forgets them*.
+
+        The dropped commands are the newest ones awaiting an "ok", their line
+        numbers are reused. The tracked position becomes unknown.
+
+        Returns
+        -------
+        int
+            number of bytes dropped
+        """
+        dropped = super().discardWrites()
+        unsent = []
+        while (self.pendingAcks
+               and sum(cmdBytes for [num, cmdBytes] in unsent) < dropped):
+            unsent.append(self.pendingAcks.pop())
+        lineNums = [num for [num, cmdBytes] in unsent if num is not None]
+        if lineNums:
+            self.lineNumber = min(lineNums) - 1
+            while self.sentLines and self.sentLines[-1][0] > self.lineNumber:
+                self.sentLines.pop()
+        if dropped:
+            self.posKnown = False
+        return dropped
+
+    def isStreamFull(self, cmdBytes, draining=False):
+        """*Returns whether a command of cmdBytes does not fit in flight*.
+
+        While writes are batched a full window is drained to half
+        (draining=True), so the refill goes out as one write.
+
+        Parameters
+        ----------
+        cmdBytes: int
+            size of the next command
+        draining: bool
+            whether waiting for room after the window was found full
+
+        Returns
+        -------
+        bool
+            True if the next command must wait for "ok"s
+        """
+        depth = self.streamDepth
+        budget = self.rxBufferSize
+        if draining and self.writeBatching:
+            depth = max(1, depth // 2)
+            budget = budget // 2
+        return bool(self.pendingAcks) and (
+            len(self.pendingAcks) >= depth
+            or self.calcBytesInFlight() + cmdBytes > budget)
+
+    def calcBytesInFlight(self):
+        """*Returns the number of sent bytes still awaiting an "ok"*.
+
+        Returns
+        -------
+        int
+            bytes in flight
+        """
+        return sum(cmdBytes for [lineNum, cmdBytes] in self.pendingAcks)
+
+    def readLine(self, timeout=0.5):
+        """*Reads a single line from the axes, blocks up to timeout*.
+
+        Parameters
+        ----------
+        timeout: float
+            max seconds to block waiting for a line
+
+        Returns
+        -------
+        String
+            Line read in (stripped), empty string if nothing
+        """
+        if self.isReaderRunning():
+            ins = self.waitMessage(kinds=self.calcReplyKinds(),
+                                   timeout=timeout)[1]
+        else:
+            self.flushWrites()  # a reply can't arrive for an unsent command
+            if self.ser.timeout != timeout:
+                self.ser.timeout = timeout
+            tStart = time.perf_counter()
+            ins = self.ser.readline().decode('utf-8').rstrip()
+            self.recordWait(time.perf_counter() - tStart)
+            self.handleMessage(self.classifyMessage(ins), ins)
+        self.printRcvd(ins)
+        return ins
+
+    def calcReplyKinds(self):
+        """*Returns the message kinds readLine takes from the reader queues*.
+
+        Auto-reported temperatures only update the status snapshot.
+
+        Returns
+        -------
+        list
+            message kinds, None for all
+        """
+        if self.autoReport > 0:
+            return ['ok', 'resend', 'error', 'echo', 'position', 'other']
+        return None
+
+    #########################################################################
+    # Status Reporting Methods
+    #########################################################################
+    def setAutoReport(self, interval):
+        """*Turns firmware auto-reporting of position (M154) and
+        temperatures (M155) on or off*.
+
+        Reports are parsed into the status snapshot (getStatus) as they
+        arrive, with useReaderThread this happens even while idle.
+
+        Parameters
+        ----------
+        interval: int
+            seconds between reports, 0 turns reporting off
+
+        Returns
+        -------
+        String
+            Response from axes
+        """
+        interval = int(interval)
+        allIn = self.writeReady("M154 S%d\n" % interval)
+        allIn += self.writeReady("M155 S%d\n" % interval)
+        self.autoReport = interval
+        if interval == 0 and self.isReaderRunning():
+            self.clearMessages(['temperature'])
+        return allIn
+
+    def getStatus(self):
+        """*Returns the latest reported position and temperatures*.
+
+        Costs no serial traffic, see setAutoReport.
+
+        Returns
+        -------
+        dict
+            'position': {axis: value}, 'temperature': {heater: [current,
+            target]} and the time.time() each was received, keys are
+            missing until the first report arrives
+        """
+        return dict(self.status)
+
+    def printRcvd(self, ins):
+        """*Prints a received line if verbose*.
+
+        Parameters
+        ----------
+        ins: String
+            line received from the axes
+        """
+        if ins != "" and self.__verbose__:
+            print(textwrap.fill("Rcvd:< " + ins, width=60,
+                                initial_indent='\t\t\t',
+                                subsequent_indent='\t\t\t'))
+
+    #########################################################################
+    # asyncAxes3DSpec Methods
+    #########################################################################
+    async def setPosModeAsync(self, newPosMode):
+        """*Sets positioning mode to relative or absolute*.
+
+        Parameters
+        ----------
+        newPosMode: String
+            Positioning mode to use for future move cmds
+        """
+        if not self.isReaderRunning():
+            return await super().setPosModeAsync(newPosMode)
+        if newPosMode == 'relative':
+            await self.writeReadyAsync("G91\n")
+            self.posMode = newPosMode
+        elif newPosMode == 'absolute':
+            await self.writeReadyAsync("G90\n")
+            self.posMode = newPosMode
+        else:
+            print("Error setting position mode to axes")
+
+    async def moveAsync(self, gcodeString):
+        """*Moves axes by set amount*.
+
+        Parameters
+        ----------
+        gCodeString: String
+            Motion command in terms of Gcode G0/G1/G2/G3 supported
+        """
+        if not self.isReaderRunning():
+            return await super().moveAsync(gcodeString)
+        if self.streamMode:
+            await self.writeStreamedAsync(gcodeString)
+        else:
+            await self.writeReadyAsync(gcodeString)
+
+    async def sendCmdAsync(self, command):
+        """*Writes command to axes device when ready*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            Response from axes
+        """
+        if not self.isReaderRunning():
+            return await super().sendCmdAsync(command)
+        return await self.writeReadyAsync(command)
+
+    async def pollAsync(self, command):
+        """*Sends message to axes and parses response*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Return
+        ------
+        String
+            Response from axes
+        """
+        if not self.isReaderRunning():
+            return await super().pollAsync(command)
+        return await self.writeReadyAsync(command)
+
+    async def setPosZeroAsync(self):
+        """*Sets current axes position to absolute (0,0,0)*.
+        """
+        if not self.isReaderRunning():
+            return await super().setPosZeroAsync()
+        await self.writeReadyAsync('G92 X0 Y0 Z0\n')
+
+    async def waitReadyAsync(self):
+        """*Awaits the next "ok" without blocking the event loop*.
+
+        Returns
+        -------
+        String
+            All text read in, empty string if nothing
+        """
+        notReady = True
+        allIn = ""
+        while notReady:
+            inp = (await self.awaitMessage(kinds=self.calcReplyKinds(),
+                                           timeout=0.5))[1]
+            self.printRcvd(inp)
+            if self.processAck(inp):
+                notReady = False
+            else:
+                self.checkStalled()
+                if inp == "":
+                    self.resendDups = 0
+            allIn += inp
+        return allIn
+
+    async def writeReadyAsync(self, command):
+        """*Sends command once the stream is drained, awaits its "ok"*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            Response from axes
+        """
+        await self.flushStreamAsync()
+        self.sendTracked(command)
+        return await self.waitReadyAsync()
+
+    async def waitMotionDoneAsync(self):
+        """*Waits until every streamed move has been executed (M400)*.
+
+        Returns
+        -------
+        String
+            All text read in
+        """
+        if not self.isReaderRunning():
+            return await super().waitMotionDoneAsync()
+        return await self.writeReadyAsync("M400\n")
+
+    async def writeStreamedAsync(self, command):
+        """*Sends command as soon as the firmware has room for it*.
+
+        Parameters
+        ----------
+        command: String
+            to write to axes
+
+        Returns
+        -------
+        String
+            Text read in while waiting for a free slot
+        """
+        cmdBytes = self.calcSentBytes(command)
+        allIn = ""
+        if self.isStreamFull(cmdBytes):
+            while self.isStreamFull(cmdBytes, draining=True):
+                allIn += await self.waitReadyAsync()
+        self.sendTracked(command)
+        return allIn
+
+    async def flushStreamAsync(self):
+        """*Awaits until every streamed command has been acknowledged*.
+
+        Returns
+        -------
+        String
+            All text read in while draining
+        """
+        allIn = ""
+        while self.pendingAcks:
+            allIn += await self.waitReadyAsync()
+        return allIn
+
+    #########################################################################
+    # Line Numbering / Resend Methods
+    #########################################################################
+    def setLineNumbering(self, doNumber):
+        """*Turns line-numbered, checksummed transport on or off*.
+
+        Parameters
+        ----------
+        doNumber: bool
+            True to send N<line> ... *<checksum> framed commands
+        """
+        self.lineNumbering = doNumber
+        if doNumber:
+            self.resetLineNumber()
+
+    def resetLineNumber(self):
+        """*Resets the firmware and host line counters to 0 (M110 N0)*.
+        """
+        self.flushStream()
+        doNumber = self.lineNumbering
+        self.lineNumbering = False  # M110 itself is sent without numbering
+        self.writeReady("M110 N0\n")
+        self.lineNumbering = doNumber
+        self.lineNumber = 0
+        self.sentLines.clear()
+        self.skipAcks = 0
+        self.resendDups = 0
+        self.resendDupsUntil = 0.0
+
+    def calcChecksum(self, line):
+        """*Calculates the Marlin checksum (XOR of all bytes) of line*.
+
+        Parameters
+        ----------
+        line: String
+            N<line> prefixed command, without trailing newline
+
+        Returns
+        -------
+        int
+            checksum value 0-255
+        """
+        checkTotal = 0
+        for byte in line.encode('utf-8'):
+            checkTotal ^= byte
+        return checkTotal
+
+    def frameLine(self, command, lineNum):
+        """*Packages command as N<lineNum> command*<checksum>*.
+
+        Parameters
+        ----------
+        command: String
+            G-code command to frame
+        lineNum: int
+            line number to assign
+
+        Returns
+        -------
+        String
+            framed command terminated with a newline
+        """
+        line = "N" + str(lineNum) + " " + command.strip()
+        return line + "*" + str(self.calcChecksum(line)) + "\n"
+
+    def checkResend(self, line):
+        """*Handles a "Resend: N" / "rs N" request from the firmware*.
+
+        Parameters
+        ----------
+        line: String
+            line received from the axes
+
+        Returns
+        -------
+        bool
+            True if line was a resend request
+        """
+        match = re.match(r'(?:Resend:|rs)\s*N?(\d+)', line)
+        if match is None or not self.lineNumbering:
+            return False
+        lineNum = int(match.group(1))
+
+        # Every resend request is followed by an "ok" for the rejected line
+        self.skipAcks += 1
+
+        # Marlin flushes its RX buffer with the request, lines already on the
+        # wire behind it are rejected with the same request right after.
+        # Later repeats are new errors, e.g. on the resent line itself.
+        if (lineNum == self.resendLine and self.resendDups > 0
+                and time.time() < self.resendDupsUntil):
+            self.resendDups -= 1  # stale line from before the rewind
+            return True
+        self.resendFrom(lineNum)
+        return True
+
+    def checkStalled(self):
+        """*Resends unacknowledged lines once the firmware has gone silent*.
+
+        A numbered line the firmware never received (dropped while its RX
+        buffer was full or being flushed) is not asked for again unless
+        another line follows it. After resendTimeOut without any "ok" or
+        resend request, all lines awaiting an "ok" are resent. Lines the
+        firmware did receive are rejected as repeats, costing one resend
+        request each.
+        """
+        if (not self.lineNumbering or self.resendTimeOut <= 0
+                or time.time() - self.lastProgress < self.resendTimeOut):
+            return
+        self.lastProgress = time.time()
+        unacked = [num for [num, cmdBytes] in self.pendingAcks
+                   if num is not None]
+        if unacked:
+            print(Fore.LIGHTYELLOW_EX + "\t\t\tNo reply for "
+                  + str(self.resendTimeOut) + " s, resending from line "
+                  + str(unacked[0]) + Style.RESET_ALL)
+            self.resendFrom(unacked[0])
+
+    def resendFrom(self, lineNum):
+        """*Rewrites all sent lines from lineNum onward*.
+
+        Parameters
+        ----------
+        lineNum: int
+            first line number to resend
+        """
+        if lineNum > self.lineNumber:
+            return  # firmware has every line, e.g. after checkStalled
+
+        # Lines before lineNum were accepted and still owe their "ok"
+        self.pendingAcks = [[num, cmdBytes] for [num, cmdBytes]
+                            in self.pendingAcks
+                            if num is None or num < lineNum]
+        toResend = [[num, line] for [num, line] in self.sentLines
+                    if num >= lineNum]
+        if not toResend or toResend[0][0] != lineNum:
+            print(Fore.LIGHTRED_EX + "\t\t\tResend of line " + str(lineNum)
+                  + " requested but no longer in history" + Style.RESET_ALL)
+            return
+        if self.__verbose__:
+            print(Fore.LIGHTYELLOW_EX + "\t\t\tResending from line "
+                  + str(lineNum) + Style.RESET_ALL)
+
+        self.resendLine = lineNum
+        self.resendDups = len(toResend) - 1
+        staleBytes = sum(len(line) for [num, line] in toResend[1:])
+        self.resendDupsUntil = (time.time() + 0.1
+                                + 10.0 * staleBytes / float(self.baudRate))
+        payload = bytearray()
+        for [num, line] in toResend:
+            payload += line.encode('utf-8')
+            self.pendingAcks.append([num, len(line.encode('utf-8'))])
+        self.writeBytes(bytes(payload))
@@ -15,6 +15,7 @@ from polychemprint3.axes import axes3DSpec
 from polychemprint3.tools.toolSpec import toolSpec
 from polychemprint3.sequence import sequenceSpec
 from polychemprint3.utility.loggerSpec import loggerSpec
+from polychemprint3.utility.stateElidingTool import stateElidingTool
 from polychemprint3.tools.nullTool import nullTool
 from polychemprint3.axes.nullAxes import nullAxes
 from polychemprint3.utility.fileHandler import fileHandler
@@ -31,7 +32,8 @@ class recipe(fileHandler, loggerSpec):
                  axes: axes3DSpec = nullAxes(),
                  tool: toolSpec = nullTool(),
                  seqList=None,
-                 __verbose__: bool = 0, **kwargs):
+                 __verbose__: bool = 0,
+                 streamMotion: bool = True, **kwargs):
 
         """*Initializes recipe object*.
 
@@ -45,6 +47,9 @@ class recipe(fileHandler, loggerSpec):
         tool: toolSpec
         seqList: list
         __verbose__: bool
+        streamMotion: bool
+            whether moves are streamed ahead of the axes (False waits for
+            each move, see operateRecipe)
         """
 
         # Pass in active axes/tool, other params
@@ -57,6 +62,7 @@ class recipe(fileHandler, loggerSpec):
         self.tool = tool
         self.__verbose__ = __verbose__
         self.seqList = seqList
+        self.streamMotion = streamMotion
         self.cmdList = []  # For storing generated commands
         super().__init__(**kwargs)
 
@@ -137,20 +143,45 @@ class recipe(fileHandler, loggerSpec):
             Whether recipe successfully completed or not
         """
         axes = axesIn
-        tool = toolIn
-
+        # Tool commands that would not change the tool state are skipped
+        tool = stateElidingTool(toolIn)
+
+        # Tools writing into the axes stream need no motion barriers
+        inlineTools = ['tool'] if tool.attachAxes(axes) else []
+
+        # Motion is streamed (writes batched) unless the recipe opts out,
+        # only timing critical lines wait for it
+        doStream = getattr(self, 'streamMotion', True)  # missing in older logs
+        lines = self.cmdList
+        if doStream:
+            wasStreaming = axes.setStreamMode(True)
+            wasBatching = axes.setWriteBatching(True)
+            lines = sequenceSpec.planSyncPoints(lines, inlineTools)
         try:
-            for line in self.cmdList:
+            for line in lines:
                 eval(line)
+                # The operator may change the tool by hand at a prompt
+                if sequenceSpec.promptPattern.search(line):
+                    tool.invalidate()
+            if doStream:
+                axes.waitMotionDone()
             return True
 
         except KeyboardInterrupt:
+            # Batched moves are dropped unsent, streamed ones would otherwise
+            # keep running
+            axes.discardWrites()
+            axes.abortMotion()
             print("\tTerminated by User....")
             return False
         except Exception as inst:
             print("\tTerminated by Error....")
             logging.exception(inst)
             return False
+        finally:
+            if doStream:
+                axes.setWriteBatching(wasBatching)
+                axes.setStreamMode(wasStreaming)
 
     def genRecipe(self):
         """*Loads print sequence into a list into cmdList attribute*.
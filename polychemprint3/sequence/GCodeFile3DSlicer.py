@@ -12,7 +12,8 @@ from datetime import datetime
 from polychemprint3.utility.fileHandler import fileHandler
 from polychemprint3.axes.axes3DSpec import Axes3DSpec
 from polychemprint3.tools.toolSpec import toolSpec
-from polychemprint3.sequence.sequenceSpec import sequenceSpec, seqParam
+from polychemprint3.sequence.sequenceSpec import sequenceSpec, seqParam, scheduleToolCode, \
+    toolScheduleParams
 from polychemprint3.tools.nullTool import nullTool
 from polychemprint3.axes.nullAxes import nullAxes
 
@@ -60,6 +61,8 @@ class GCodeFile3DSlicer(sequenceSpec):
             "Ttrv": seqParam("Tool travel Value", "0", "",
                              "Tool value during travel moves"),
         }
+        # Pre-charge/bleed and tool lead, shared by the G-code importers
+        self.dictParams.update(toolScheduleParams())
 
         # Pass values to parent
         super().__init__(axes, tool, self.dictParams, **kwargs)
@@ -199,6 +202,8 @@ class GCodeFile3DSlicer(sequenceSpec):
                     print("\t\tAdding Tool On/Off/Travel commands...")
                     fullGlines = self.insertToolCode(filteredGLines)
                     if fullGlines:
+                        fullGlines = scheduleToolCode(fullGlines, self.dictParams,
+                                                      self.tool)
                         print("\t\tTool Commands added successfully!")
                         print("\t\tLoading Python Commands!")
 
@@ -12,7 +12,8 @@ from datetime import datetime
 from polychemprint3.utility.fileHandler import fileHandler
 from polychemprint3.axes.axes3DSpec import Axes3DSpec
 from polychemprint3.tools.toolSpec import toolSpec
-from polychemprint3.sequence.sequenceSpec import sequenceSpec, seqParam
+from polychemprint3.sequence.sequenceSpec import sequenceSpec, seqParam, scheduleToolCode, \
+    toolScheduleParams
 from polychemprint3.tools.nullTool import nullTool
 from polychemprint3.axes.nullAxes import nullAxes
 
@@ -74,6 +75,8 @@ class GCodeFileInkscape(sequenceSpec):
             "Ttrv": seqParam("Tool travel Value", "5", "",
                              "Tool value during travel moves"),
         }
+        # Pre-charge/bleed and tool lead, shared by the G-code importers
+        self.dictParams.update(toolScheduleParams())
 
         # Pass values to parent
         super().__init__(axes, tool, self.dictParams, **kwargs)
@@ -256,6 +259,8 @@ class GCodeFileInkscape(sequenceSpec):
                     print("\t\tAdding Tool On/Off/Travel commands...")
                     fullGlines = self.insertToolCode(filteredGLines)
                     if fullGlines:
+                        fullGlines = scheduleToolCode(fullGlines, self.dictParams,
+                                                      self.tool)
                         print("\t\tTool Commands added successfully!")
                         print("\t\tLoading Python Commands!")
 
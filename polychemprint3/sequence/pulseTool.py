@@ -80,16 +80,18 @@ class pulseTool(sequenceSpec):
 
             # Step by Step appending commands to list for execution
             while count < float(numCycles):
-                # Set tool to On value, engage if necessary, and pause for On duration
+                # Set tool to On value
                 cmds.append("tool.setValue(\"" + str(toolOn) + "\")")
-                if doDisengage or count == 0:
-                    cmds.append("tool.engage()")
-                cmds.append("time.sleep(float(\"" + str(timeOn) + "\"))")
-
-                # Set tool to Off value OR disengage and pause for Off duration
                 if doDisengage:
-                    cmds.append("tool.disengage()")
+                    # Single timed exposure (device timed where supported)
+                    cmds.append("tool.expose(float(\"" + str(timeOn) + "\"))")
                 else:
+                    # Engage if necessary, and pause for On duration
+                    if count == 0:
+                        cmds.append("tool.engage()")
+                    cmds.append("time.sleep(float(\"" + str(timeOn) + "\"))")
+
+                    # Set tool to Off value
                     cmds.append("tool.setValue(\"" + str(toolOff) + "\")")
                 cmds.append("time.sleep(float(\"" + str(timeOff) + "\"))")
 
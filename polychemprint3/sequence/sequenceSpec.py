@@ -7,15 +7,24 @@ Specifies modular pre-written motion and dispense sequences for common prints.
 | Author: Bijal Patel
 
 """
+import ast
 import logging
+import re
 import time
 from abc import ABC, abstractmethod
 from polychemprint3.axes.axes3DSpec import Axes3DSpec
 from polychemprint3.tools.toolSpec import toolSpec
 from polychemprint3.utility.loggerSpec import loggerSpec
+from polychemprint3.utility.stateElidingTool import stateElidingTool
 from polychemprint3.tools.nullTool import nullTool
 from polychemprint3.axes.nullAxes import nullAxes
 
+# Command lines prompting the operator, who may change the tools by hand
+promptPattern = re.compile(r'\binput\(')
+
+# Comment marking tool command lines the axes need not stop for
+noSyncTag = "# no sync"
+
 
 class sequenceSpec(loggerSpec, ABC):
     """Abstract Base Class for predefined print sequences."""
@@ -47,6 +56,11 @@ class sequenceSpec(loggerSpec, ABC):
                           "description": seqParam("Sequence description", "default", "default", "default"),
                           "owner": seqParam("PCP_Default", "default", "default", "default"), }
 
+        # Shared by all sequences, see operateSeq
+        dictParams.setdefault("streamMotion", seqParam(
+            "Stream Motion", "True", "(True/False)",
+            "Stream moves ahead of the axes, False waits for each move"))
+
         self.dictParams = dictParams
         self.verbose = __verbose__
         # Unwrap parameter to get just the string name and description
@@ -66,19 +80,52 @@ class sequenceSpec(loggerSpec, ABC):
             Whether sequence successfully completed or not
         """
         axes = self.axes
-        tool = self.tool
-        tool2 = self.tool2
-        tool3 = self.tool3
+        # Tool commands that would not change the tool state are skipped
+        tool = stateElidingTool(self.tool)
+        tool2 = stateElidingTool(self.tool2)
+        tool3 = stateElidingTool(self.tool3)
 
+        # Tools writing into the axes stream need no motion barriers
+        inlineTools = [toolName for [toolName, toolObj]
+                       in [['tool', tool], ['tool2', tool2], ['tool3', tool3]]
+                       if toolObj.attachAxes(axes)]
+
+        # Motion is streamed (writes batched) unless the sequence opts out,
+        # only timing critical lines wait for it
+        param = self.dictParams.get("streamMotion")  # missing in older logs
+        doStream = param is None or str(param.value).lower() != "false"
+        lines = self.cmdList
+        if doStream:
+            wasStreaming = axes.setStreamMode(True)
+            wasBatching = axes.setWriteBatching(True)
+            lines = planSyncPoints(lines, inlineTools)
         try:
-            for line in self.cmdList:
+            # Tool commands on different tools at the same point run side by side
+            for line in groupToolCalls(lines, inlineTools):
                 eval(line)
+                # The operator may change the tools by hand at a prompt
+                if promptPattern.search(line):
+                    for toolObj in [tool, tool2, tool3]:
+                        toolObj.invalidate()
+            if doStream:
+                axes.waitMotionDone()
             return True
 
+        except KeyboardInterrupt:
+            # Batched moves are dropped unsent, streamed ones would otherwise
+            # keep running
+            axes.discardWrites()
+            axes.abortMotion()
+            print("\tTerminated by User....")
+            raise  # tools are disengaged by the caller
         except Exception as inst:
             print("\tTerminated by Error....")
             logging.exception(inst)
             return False
+        finally:
+            if doStream:
+                axes.setWriteBatching(wasBatching)
+                axes.setStreamMode(wasStreaming)
 
     @abstractmethod
     def genSequence(self):
@@ -116,6 +163,357 @@ class sequenceSpec(loggerSpec, ABC):
         super().loadLogSelf(logString)
 
 
+def planSyncPoints(cmdList, inlineTools=()):
+    """*Inserts motion barriers before timing critical command lines*.
+
+    Axes commands may be streamed ahead of the physical motion. Tool
+    actions, sleeps and user prompts must happen where the axes actually
+    are, so an axes.waitMotionDone() is placed before them whenever axes
+    motion (move/sendCmd/poll) was commanded since the last barrier. Lines
+    tagged with noSyncTag are sent as the stream reaches them.
+
+    Parameters
+    ----------
+    cmdList: list
+        command strings as in sequenceSpec.cmdList
+    inlineTools: list
+        names (tool, tool2, tool3) of tools whose commands are queued in the
+        axes stream themselves (see toolSpec.attachAxes), no barrier needed
+
+    Returns
+    -------
+    list
+        command strings with barriers inserted
+    """
+    toolPattern = re.compile(
+        r'\b(tool\d?)\.(?:engage|disengage|setValue|expose)\(')
+    waitPattern = re.compile(r'\b(?:time\.)?sleep\(|\binput\(')
+    motionPattern = re.compile(r'\baxes\.(move|sendCmd|poll)\(')
+    planned = []
+    moved = False  # axes commands issued since the last barrier
+    for line in cmdList:
+        isSync = noSyncTag not in line and (
+            waitPattern.search(line) is not None
+            or any(match.group(1) not in inlineTools
+                   for match in toolPattern.finditer(line)))
+        if moved and isSync:
+            planned.append("axes.waitMotionDone()")
+            moved = False
+        planned.append(line)
+        if motionPattern.search(line):
+            moved = True
+    return planned
+
+
+def groupToolCalls(cmdList, inlineTools=()):
+    """*Merges consecutive commands on different tools into one dispatch*.
+
+    A run of command lines that are each a single tool/tool2/tool3 call,
+    spanning more than one tool, is replaced by a dispatchToolCalls line so
+    the tools are commanded in parallel. The run ends at any other line, so
+    it is joined before the next motion.
+
+    Parameters
+    ----------
+    cmdList: list
+        command strings, as returned by planSyncPoints
+    inlineTools: list
+        names of tools queued in the axes stream (see toolSpec.attachAxes),
+        left in line with the motion
+
+    Returns
+    -------
+    list
+        command strings with tool runs grouped
+    """
+    grouped = []
+    run = []  # [line, [toolName, method, argsText]] of consecutive tool calls
+
+    def endRun():
+        if len({call[0] for [line, call] in run}) > 1:
+            grouped.append("dispatchToolCalls(["
+                           + ", ".join("[%s.%s, (%s)]" % tuple(call)
+                                       for [line, call] in run)
+                           + "])")
+        else:
+            grouped.extend(line for [line, call] in run)
+        run.clear()
+
+    for line in cmdList:
+        call = parseToolCall(line)
+        if call is None or call[0] in inlineTools:
+            endRun()
+            grouped.append(line)
+        else:
+            run.append([line, call])
+    endRun()
+    return grouped
+
+
+def parseToolCall(line):
+    """*Splits a line holding a single tool command into its parts*.
+
+    Parameters
+    ----------
+    line: String
+        command string, e.g. "tool2.setValue(20)"
+
+    Returns
+    -------
+    list
+        [toolName, method, argsText], argsText ending in a comma
+        (e.g. ["tool2", "setValue", "20,"]), or None if not a tool command
+    """
+    try:
+        node = ast.parse(line.strip(), mode='eval').body
+    except SyntaxError:
+        return None
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and isinstance(node.func.value, ast.Name)
+            and re.fullmatch(r'tool\d?', node.func.value.id)
+            and node.func.attr in ('engage', 'disengage', 'setValue',
+                                   'expose')
+            and not node.keywords):
+        argsText = line[line.index('(') + 1:line.rindex(')')].strip()
+        return [node.func.value.id, node.func.attr,
+                argsText + ',' if argsText else '']
+    return None
+
+
+def dispatchToolCalls(calls):
+    """*Runs tool commands in parallel, one worker thread per tool*.
+
+    Commands on the same tool keep their order. Returns once all are done.
+
+    Parameters
+    ----------
+    calls: list
+        [bound tool method, args tuple] pairs, e.g. [[tool.disengage, ()],
+        [tool2.engage, ()]]
+
+    Returns
+    -------
+    list
+        each command's return value, in order
+    """
+    futures = [method.__self__.getWorker().submit(method, *args)
+               for [method, args] in calls]
+    return [future.result() for future in futures]
+
+
+def schedulePrecharge(gLines, onValue, prechargeValue, bleedValue,
+                      prechargeLead, bleedLead, byDistance=True, leadTime=0):
+    """*Adds pre-charge/bleed tool values ahead of print segment starts/ends*.
+
+    A print segment starts at tool.setValue(onValue) and ends at the next
+    other tool.setValue. prechargeValue is set prechargeLead before each
+    start (during the travel move), bleedValue bleedLead before each end.
+    All tool commands are also moved back by the path travelled in leadTime,
+    in the same shiftToolLines pass so the pre-charge stays ahead of the on
+    value. The axes still stop at each moved command (planSyncPoints), so
+    leadTime only covers what happens after it is sent (see
+    scheduleToolCode and toolSpec.getLeadTime).
+
+    Pre-charge/bleed lines are tagged with noSyncTag so the axes do not
+    stop inside the move they split. While streaming they are sent when
+    the host reaches them, which may be before the axes do.
+
+    Parameters
+    ----------
+    gLines: list
+        G-code lines and tool command lines, as made by the G-code
+        importers' insertToolCode
+    onValue: String
+        tool value while printing
+    prechargeValue: String
+        tool value before a print starts, None to skip
+    bleedValue: String
+        tool value before a print ends, None to skip
+    prechargeLead: float
+        how long before a print starts to pre-charge, mm or s
+    bleedLead: float
+        how long before a print ends to bleed, mm or s
+    byDistance: bool
+        whether leads are distances along the path (mm) or times (s)
+    leadTime: float
+        seconds every tool command is sent early, see toolSpec.getLeadTime
+
+    Returns
+    -------
+    list
+        lines with pre-charge/bleed commands added
+    """
+    def leads(lead):
+        # [distance, time] to move a tool command back by
+        return [lead, leadTime] if byDistance else [0, lead + leadTime]
+
+    onLine = "tool.setValue(" + str(onValue) + ")"
+    entries = []
+    printing = False
+    for line in gLines:
+        if line.startswith("tool.setValue("):
+            if line == onLine and not printing:
+                if prechargeValue is not None:
+                    entries.append(["tool.setValue(" + str(prechargeValue)
+                                    + ")  " + noSyncTag]
+                                   + leads(prechargeLead))
+                printing = True
+            elif line != onLine and printing:
+                if bleedValue is not None:
+                    entries.append(["tool.setValue(" + str(bleedValue)
+                                    + ")  " + noSyncTag] + leads(bleedLead))
+                printing = False
+        entries.append([line] + leads(0))
+    return shiftToolLines(entries)
+
+
+def scheduleToolCode(gLines, dictParams, tool):
+    """*Applies a G-code importer's pre-charge/bleed and tool lead params*.
+
+    Parameters
+    ----------
+    gLines: list
+        G-code lines and tool command lines, as made by the G-code
+        importers' insertToolCode
+    dictParams: dict
+        the importer's parameters, see toolScheduleParams. Parameters
+        missing in older logs leave pre-charge/bleed off and the tool lead
+        on auto.
+    tool: toolSpec
+        tool the commands are for, gives the auto lead time
+
+    Returns
+    -------
+    list
+        lines with pre-charge/bleed commands added and tool commands
+        shifted earlier
+    """
+    values = {}
+    for [key, default] in [["Tpre", "-1"], ["Tbleed", "-1"],
+                           ["preLead", "0"], ["bleedLead", "0"],
+                           ["leadUnit", "mm"], ["toolLead", "auto"]]:
+        param = dictParams.get(key)
+        values[key] = default if param is None else str(param.value)
+
+    if values["toolLead"].lower() == "auto":
+        leadTime = tool.getLeadTime()
+    else:
+        leadTime = float(values["toolLead"])
+    return schedulePrecharge(
+        gLines, dictParams.get("Ton").value,
+        None if values["Tpre"] == "-1" else values["Tpre"],
+        None if values["Tbleed"] == "-1" else values["Tbleed"],
+        float(values["preLead"]), float(values["bleedLead"]),
+        byDistance=values["leadUnit"].lower() != "s", leadTime=leadTime)
+
+
+def toolScheduleParams():
+    """*Returns the seqParams read by scheduleToolCode*.
+
+    Returns
+    -------
+    dict
+        parameter name: seqParam, to add to a G-code importer's dictParams
+    """
+    return {
+        "Tpre": seqParam("Tool pre-charge Value", "-1", "",
+                         "Tool value set before print moves start, -1 to disable"),
+        "preLead": seqParam("Pre-charge Lead", "1", "mm or s",
+                            "How far before print moves start to pre-charge"),
+        "Tbleed": seqParam("Tool bleed Value", "-1", "",
+                           "Tool value set before print moves end, -1 to disable"),
+        "bleedLead": seqParam("Bleed Lead", "1", "mm or s",
+                              "How far before print moves end to bleed"),
+        "leadUnit": seqParam("Pre-charge/Bleed Lead Unit", "mm", "(mm/s)",
+                             "Leads as distance along the path (mm) or time (s)"),
+        "toolLead": seqParam("Tool Lead Time", "auto", "s",
+                             "Send tool commands early by this time, "
+                             "auto uses the tool's calibrated actuation delay"),
+    }
+
+
+def shiftToolLines(entries):
+    """*Moves each tool command earlier along the toolpath by its lead*.
+
+    Each tool command is moved back along the preceding linear moves
+    (G0/G1, absolute positioning, modal F in mm/min), splitting the move
+    it lands in. Tool commands are never moved past arcs, relative moves,
+    other tool commands or the start of the path.
+
+    Parameters
+    ----------
+    entries: list
+        [line, distance, time] entries: G-code lines and tool command lines
+        (containing "tool"). A tool command is moved back by distance (mm)
+        plus the path travelled in time (s), both 0 to keep it.
+
+    Returns
+    -------
+    list
+        lines with tool commands shifted earlier
+    """
+    wordPattern = re.compile(r'([GXYZF])\s*(-?\d*\.?\d+)')
+    pos = {'X': 0.0, 'Y': 0.0, 'Z': 0.0}
+    motion = 1  # modal G0/G1/G2/G3
+    feed = None  # modal feed rate, mm/min
+    isAbsolute = True
+
+    # Each entry: [line, start, end, feed], start None if it can't be split
+    planned = []
+    for [line, leadDistance, leadTime] in entries:
+        if "tool" in line:
+            # Pull back through the moves just before the tool command
+            moved = []
+            while ((leadDistance > 0 or leadTime > 0) and planned
+                   and planned[-1][1] is not None):
+                [prevLine, start, end, prevFeed] = planned[-1]
+                length = sum((end[axis] - start[axis]) ** 2
+                             for axis in pos) ** 0.5
+                speed = prevFeed / 60
+                reach = leadDistance + leadTime * speed  # lead left, in mm
+                if length <= reach:
+                    usedDistance = min(leadDistance, length)
+                    leadDistance -= usedDistance
+                    leadTime -= (length - usedDistance) / speed
+                    moved.insert(0, planned.pop())
+                    continue
+                # Split the move where the lead begins
+                fraction = 1 - reach / length
+                split = {axis: start[axis] + (end[axis] - start[axis])
+                         * fraction for axis in pos}
+                words = re.findall(r'G\s*\d+|F\s*-?\d*\.?\d+', prevLine)
+                words += [axis + ('%.4f' % split[axis]).rstrip('0').rstrip('.')
+                          for axis in pos if re.search(axis, prevLine)]
+                planned[-1] = [" ".join(words) + " ", start, split, prevFeed]
+                moved.insert(0, [prevLine, split, end, prevFeed])
+                leadDistance = leadTime = 0
+            planned.append([line, None, None, None])
+            planned.extend(moved)
+            continue
+
+        words = wordPattern.findall(line.upper())
+        start = dict(pos)
+        for [letter, value] in words:
+            if letter == 'G':
+                code = int(float(value))
+                if code in (0, 1, 2, 3):
+                    motion = code
+                elif code in (90, 91):
+                    isAbsolute = code == 90
+            elif letter == 'F':
+                feed = float(value)
+            else:
+                pos[letter] = (float(value) if isAbsolute
+                               else pos[letter] + float(value))
+        isLinear = (motion in (0, 1) and isAbsolute and bool(feed)
+                    and any(letter in pos for [letter, value] in words))
+        if isLinear:
+            planned.append([line, start, dict(pos), feed])
+        else:
+            planned.append([line, None, None, None])
+    return [entry[0] for entry in planned]
+
+
 class seqParam:
     """Base Class for parameters used in sequences."""
 
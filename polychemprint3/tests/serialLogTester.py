@@ -0,0 +1,27 @@
+from polychemprint3.axes.lulzbotTaz6_BP import lulzbotTaz6_BP
+from polychemprint3.axes.grblAxes import grblAxes
+from polychemprint3.tools.ultimusExtruder import ultimusExtruder
+from polychemprint3.tools.omnicureS2000 import omnicureS2000
+from polychemprint3.tools.laser6W import laser6W
+from polychemprint3.utility.virtualMarlin import virtualMarlin
+
+### Every serial device must log itself, reader thread objects left out
+for deviceClass in [lulzbotTaz6_BP, grblAxes, ultimusExtruder, omnicureS2000,
+                    laser6W]:
+    device = deviceClass(__verbose__=0)
+    log = device.writeLogSelf()
+    restored = deviceClass(__verbose__=0)
+    restored.loadLogSelf(log)
+    print(deviceClass.__name__ + ": logged %d chars, reloaded reader stopped: "
+          % len(log) + str(not restored.isReaderRunning()))
+
+### Also while connected with the background reader running
+sim = virtualMarlin()
+taz = lulzbotTaz6_BP(name="virtualTaz", devAddress=sim.start(),
+                     __verbose__=0, useReaderThread=True)
+taz.activate()
+taz.move("G1 X1 F3000\n")
+print("Connected lulzbotTaz6_BP: logged %d chars, reader running: "
+      % len(taz.writeLogSelf()) + str(taz.isReaderRunning()))
+taz.deactivate()
+sim.stop()
@@ -0,0 +1,52 @@
+import time
+from polychemprint3.axes.lulzbotTaz6_BP import lulzbotTaz6_BP
+from polychemprint3.utility.virtualMarlin import virtualMarlin
+
+### Throughput of the real driver against a simulated printer
+nLines = 500
+sim = virtualMarlin(ackLatency=0.002, plannerDepth=16, lineRate=1000)
+
+for options in [{},
+                {'streamMode': True},
+                {'streamMode': True, 'lineNumbering': True},
+                {'streamMode': True, 'useReaderThread': True}]:
+    taz = lulzbotTaz6_BP(name="virtualTaz", devAddress=sim.start(),
+                         __verbose__=0, **options)
+    taz.activate()
+
+    tStart = time.time()
+    for i in range(nLines):
+        taz.move("G1 X0.1 F3000\n")
+    taz.flushStream()
+    tTotal = time.time() - tStart
+
+    print(str(options) + ": %.0f lines/s" % (nLines / tTotal))
+    print("\tDevice stats: " + str(sim.stats))
+    print("\tWait stats: " + str(taz.getWaitStats()))
+    taz.deactivate()
+    sim.stop()
+
+### Resend recovery: every 7th numbered line fails its checksum while moves
+### are streamed and written in batches, the run must still finish
+sim = virtualMarlin(ackLatency=0.002, plannerDepth=16, lineRate=1000,
+                    rejectEvery=7)
+
+for options in [{'streamMode': True, 'lineNumbering': True},
+                {'streamMode': True, 'lineNumbering': True,
+                 'useReaderThread': True}]:
+    taz = lulzbotTaz6_BP(name="virtualTaz", devAddress=sim.start(),
+                         __verbose__=0, resendTimeOut=1, **options)
+    taz.activate()
+    taz.setWriteBatching(True)
+
+    tStart = time.time()
+    for i in range(nLines):
+        taz.move("G1 X0.1 F3000\n")
+    taz.flushStream()
+    tTotal = time.time() - tStart
+
+    print(str(options) + ": %.0f lines/s with resends" % (nLines / tTotal))
+    print("\tDevice stats: " + str(sim.stats))
+    print("\tLast line: firmware %d, host %d" % (sim.lastLine, taz.lineNumber))
+    taz.deactivate()
+    sim.stop()
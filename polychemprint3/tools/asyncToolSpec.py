@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""Contains asyncToolSpec, coroutine counterparts of the toolSpec methods.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+
+# Imports ####################################################################
+from polychemprint3.utility.asyncDeviceSpec import asyncDeviceSpec
+
+
+class asyncToolSpec(asyncDeviceSpec):
+    """Abstract Base Class for the asyncio interface of tool drivers.
+
+    By default each method runs its blocking toolSpec twin in the tool's
+    worker thread, drivers with a non-blocking transport override them.
+    """
+
+    async def activateAsync(self):
+        """Makes required serial connections and returns status as
+        True/False.
+
+        Returns
+        -------
+        bool
+            True if tool serial connection made and tool is ready to use
+            False if error generated and tool is not ready for use
+        """
+        return await self.runBlocking(self.activate)
+
+    async def deactivateAsync(self):
+        """Closes serial communication and returns status as True/False.
+
+        Returns
+        -------
+        bool
+            True if tool serial connection destroyed and tool disabled.
+            False if error generated and serial communication not suspended.
+        """
+        return await self.runBlocking(self.deactivate)
+
+    # Tool Action (Dispensing) Methods #######################################
+    async def engageAsync(self):
+        """Turn tool primary action on (dispense/LASER beam on, etc).
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.engage
+        """
+        return await self.runBlocking(self.engage)
+
+    async def disengageAsync(self):
+        """Turn tool primary action off (stops dispense/LASER beam off, etc).
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.disengage
+        """
+        return await self.runBlocking(self.disengage)
+
+    async def setValueAsync(self, value):
+        """Set the primary tool action value (e.g., Laser power,
+        extruder pressure, etc.).
+
+        Parameters
+        ----------
+        value: String
+            The new value of the parameter as a string.
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.setValue
+        """
+        return await self.runBlocking(self.setValue, value)
+
+    async def exposeAsync(self, seconds):
+        """Turn tool primary action on for a set time, then off.
+
+        Parameters
+        ----------
+        seconds: float
+            how long the tool should be on
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.expose
+        """
+        return await self.runBlocking(self.expose, seconds)
+
+    async def runBatchAsync(self, actions):
+        """Runs a list of timed tool actions.
+
+        Parameters
+        ----------
+        actions: list
+            [seconds, action, args...] entries, see toolSpec.submitBatch
+
+        Returns
+        -------
+        list
+            Same as toolSpec.runBatch
+        """
+        return await self.runBlocking(self.runBatch, actions)
+
+    async def getStateAsync(self):
+        """Returns the current dispense/action state (on/off).
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.getState
+        """
+        return await self.runBlocking(self.getState)
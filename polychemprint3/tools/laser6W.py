@@ -10,14 +10,22 @@ Implements the Tool base class for Danny's arduino-uno controlled 6W LASER.
 
 from polychemprint3.tools.toolSpec import toolSpec
 from polychemprint3.utility.serialDeviceSpec import serialDeviceSpec
+from polychemprint3.utility import serialRegistry
 import serial
-import io
 import time
 import logging
 
 
 class laser6W(serialDeviceSpec, toolSpec):
-    """Implements the Tool base class for Danny's 6W LASER."""
+    """Implements the Tool base class for Danny's 6W LASER.
+
+    In "inline" powerMode the laser is driven from the axes controller
+    (spindle/laser or fan PWM output) and power changes are written into
+    the axes G-code stream, so they run in planner order with the moves.
+    """
+
+    __transientAttributes__ = serialDeviceSpec.__transientAttributes__ + [
+        'axes']
 
     ### Construct/Destruct METHODS
     def __init__(self,
@@ -25,9 +33,14 @@ class laser6W(serialDeviceSpec, toolSpec):
                  units="percent",
                  devAddress="/dev/ttyACM1"
                             "",
-                 baudRate=115200,
+                 baudRate=None,
                  commsTimeOut=0.001,
                  __verbose__=1,
+                 powerMode="serial",
+                 inlineOnCmd="M3 S{s}",
+                 inlineOffCmd="M5",
+                 inlineMaxS=255,
+                 inlineDwellCmd="G4 P{ms}",
                  **kwargs):
         """*Initializes Tool Object*.
 
@@ -40,15 +53,33 @@ class laser6W(serialDeviceSpec, toolSpec):
         devAddress: Strong
             device address on this computer
         baudRate: int
-            baud rate
+            baud rate, None for the saved/default rate
         commsTimeOut: int
             how long to wait for serial device before timeout on reads
         verbose: bool
             whether details should be printed to cmd line
+        powerMode: String
+            "serial" to command the laser's arduino, "inline" to write power
+            commands into the axes G-code stream
+        inlineOnCmd: String
+            inline power command, {s} is replaced by the S value
+            (e.g. "M106 S{s}" for a fan PWM output)
+        inlineOffCmd: String
+            inline laser off command (e.g. "M107" for a fan PWM output)
+        inlineMaxS: int
+            S value for 100% power (255 Marlin, 1000 GRBL default $30)
+        inlineDwellCmd: String
+            firmware dwell for timed exposures, {ms} is replaced by the time
+            in milliseconds, {sec} in seconds (GRBL: "G4 P{sec}")
         """
 
         self.dispenseStatus = 0  # off
         self.internalVal = "2"
+        self.powerMode = powerMode
+        self.inlineOnCmd = inlineOnCmd
+        self.inlineOffCmd = inlineOffCmd
+        self.inlineMaxS = inlineMaxS
+        self.inlineDwellCmd = inlineDwellCmd
         inputs = {"name": name,
                   "units": units,
                   "devAddress": devAddress,
@@ -68,6 +99,12 @@ class laser6W(serialDeviceSpec, toolSpec):
             False if not ready
         """
         passed = False
+        if self.powerMode == "inline":
+            print("\t\t\tLaser6W in inline mode, power commands are written "
+                  "to the axes G-code stream.")
+            self.dispenseStatus = 0
+            return True
+
         # Start Serial Device
         print("\t\t\tEstablishing Serial Connection to Laser6W...")
         [status, message] = self.startSerial()
@@ -97,6 +134,8 @@ class laser6W(serialDeviceSpec, toolSpec):
         """
         print("\t\t\tSetting laser to minimum power and turning off.")
         self.disengage()
+        if self.powerMode == "inline":
+            return True
         self.__writeSerial__("off\n")
         passed = False
         # Stop Serial Device
@@ -119,7 +158,10 @@ class laser6W(serialDeviceSpec, toolSpec):
         """
         try:
             if self.dispenseStatus == 0:
-                self.__writeSerial__(self.internalVal + "\n")
+                if self.powerMode == "inline":
+                    self.writeInline(self.inlineOnCmd.format(s=self.calcInlineS()))
+                else:
+                    self.__writeSerial__(self.internalVal + "\n")
                 self.dispenseStatus = 1
                 return [1, "Dispense On"]
             else:
@@ -138,7 +180,10 @@ class laser6W(serialDeviceSpec, toolSpec):
         """
         try:
             if self.dispenseStatus == 1:
-                self.__writeSerial__("1\n")
+                if self.powerMode == "inline":
+                    self.writeInline(self.inlineOffCmd)
+                else:
+                    self.__writeSerial__("1\n")
                 self.dispenseStatus = 0
                 return [1, "Dispense Off"]
 
@@ -162,11 +207,62 @@ class laser6W(serialDeviceSpec, toolSpec):
         """
         try:
             self.internalVal = str(value)
+            if self.powerMode == "inline":
+                # Applied on engage, or right away in the stream if on
+                if self.dispenseStatus == 1:
+                    return self.writeInline(
+                        self.inlineOnCmd.format(s=self.calcInlineS()))
+                return [1, "Value stored: " + self.internalVal]
             return self.__writeSerial__(self.internalVal + '\n')
         except Exception as inst:
             return [-1, "Error: Value could not be set for LASER"
                     + inst.__str__()]
 
+    def expose(self, seconds):
+        """*Turns laser on for a set time*.
+
+        In inline mode on, dwell and off are all queued in the axes stream,
+        so the exposure is timed by the axes firmware.
+
+        Parameters
+        ----------
+        seconds: float
+            how long the laser should be on
+
+        Returns
+        -------
+        [1, "Exposure queued"] / output of toolSpec.expose
+        [-1, 'Failed exposure ' + inst.__str__()]
+        """
+        if self.powerMode != "inline":
+            return super().expose(seconds)
+        try:
+            self.engage()
+            self.writeInline(self.inlineDwellCmd.format(
+                ms=int(round(float(seconds) * 1000)), sec=float(seconds)))
+            self.disengage()
+            return [1, "Exposure of " + str(seconds) + " s queued"]
+        except Exception as inst:
+            return [-1, 'Failed exposure ' + inst.__str__()]
+
+    def attachAxes(self, axes):
+        """*Keeps the active axes if power is written into its stream*.
+
+        Parameters
+        ----------
+        axes: Axes3DSpec
+            active axes
+
+        Returns
+        -------
+        bool
+            True in inline mode (commands queued in the axes stream)
+        """
+        if self.powerMode != "inline":
+            return False
+        self.axes = axes
+        return True
+
     def getState(self):
         """*Returns active state of tool*.
 
@@ -203,7 +299,7 @@ class laser6W(serialDeviceSpec, toolSpec):
         return 'unset' not in connectParam
 
     def startSerial(self):
-        """*Creates and connects pySerial device*.
+        """*Connects pySerial device, reusing the port if still open*.
 
         Returns
         -------
@@ -216,38 +312,41 @@ class laser6W(serialDeviceSpec, toolSpec):
         else:
             # Try to connect, catch errors and return to user
             try:
-                self.ser = serial.Serial(port=self.devAddress,
-                                         baudrate=self.baudRate,
-                                         bytesize=serial.EIGHTBITS,
-                                         parity=serial.PARITY_NONE,
-                                         stopbits=serial.STOPBITS_ONE,
-                                         timeout=1,
-                                         xonxoff=False,
-                                         rtscts=False,
-                                         dsrdtr=False,
-                                         writeTimeout=2
-                                         )
-                # Use ser for writing
-                # Use sReader for buffered read
-                self.sReader = io.TextIOWrapper(io.BufferedReader(self.ser))
+                [self.ser, isNew] = serialRegistry.acquirePort(
+                    self, self.devAddress,
+                    baudrate=self.baudRate,
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE,
+                    timeout=1,
+                    xonxoff=False,
+                    rtscts=False,
+                    dsrdtr=False,
+                    write_timeout=2)
+                # Reused port: the arduino did not reset, nothing to read
+                if not isNew:
+                    return [1, "\t\t\tSerial Connection to Laser6W reused (port kept open)"]
 
                 # Clear initial garbage text in output buffer
                 self.ser.reset_output_buffer()
 
+                # Read straight from ser, a buffered wrapper would close the
+                # shared port when garbage collected
                 time.sleep(0.25)
-                lineIn = self.sReader.readline()
+                lineIn = self.ser.readline().decode('utf-8', 'replace')
                 linesIn = [lineIn]
 
                 # keep reading until empty
                 while lineIn:
                     time.sleep(0.25)
-                    lineIn = self.sReader.readline()
+                    lineIn = self.ser.readline().decode('utf-8', 'replace')
                     linesIn.append(lineIn)
                 # Convert lines in to a string
                 linesIn = " ".join(linesIn)
                 return [1, "\t\t\tSerial Connection to Laser6W established successfully! \n\t\t\t\tRead in: [" + linesIn + "]"]
 
             except Exception as inst:
+                self.closeFailedPort()
                 return [-1, '\t\t\tFailed Creating pySerial... ' + str(inst)]
 
     def stopSerial(self):
@@ -259,10 +358,9 @@ class laser6W(serialDeviceSpec, toolSpec):
         [-1, "Error: Tool could not be stopped + error text"]
         """
         try:
-            print("\t\t\tClosing Laser6W Serial Port...")
-            time.sleep(1)
-            self.ser.close()
-            return [1, "Closed Laser6W Serial Port Successfully."]
+            # Port is kept open for reactivation (serialRegistry)
+            serialRegistry.releasePort(self, self.devAddress)
+            return [1, "Released Laser6W Serial Port Successfully."]
         except Exception as inst:
             return [0, 'Error on closing serial device: ' + self.name
                     + ' : ' + inst.__str__()]
@@ -301,7 +399,7 @@ class laser6W(serialDeviceSpec, toolSpec):
         """
         if self.checkIfSerialConnectParamsSet() == 1:
             try:
-                self.ser.write(text.encode('utf-8'))
+                self.writeBytes(text.encode('utf-8'))
                 if self.__verbose__:
                     print('\t\t\t\tCommand Sent to LASER: ' + repr(text))
                 return [1, 'Command Sent: ' + repr(text)]
@@ -339,6 +437,46 @@ class laser6W(serialDeviceSpec, toolSpec):
             return [0, 'Error on read from Serial Device: ' + self.name
                     + ' : ' + inst.__str__()]
 
+    def writeInline(self, command):
+        """*Queues a power command in the attached axes' G-code stream*.
+
+        Parameters
+        ----------
+        command: String
+            G-code command, without newline
+
+        Returns
+        -------
+        [1, 'Command Queued: ' + command]
+
+        Raises
+        ------
+        RuntimeError
+            no axes attached (see attachAxes)
+        """
+        if self.axes is None:
+            raise RuntimeError("no axes attached for inline laser power")
+        self.axes.move(command + "\n")
+        if self.__verbose__:
+            print('\t\t\t\tCommand Queued to Axes: ' + repr(command))
+        return [1, 'Command Queued: ' + command]
+
+    def calcInlineS(self):
+        """*Converts the percent power value to the firmware S value*.
+
+        Returns
+        -------
+        int
+            S value, 0 to inlineMaxS
+        """
+        power = min(max(float(self.internalVal), 0), 100)
+        return int(round(power / 100 * self.inlineMaxS))
+
+    def __initTransient__(self):
+        """*Creates reader state, no axes attached*."""
+        super().__initTransient__()
+        self.axes = None
+
     ##########################################################################
     ### PCP_BasicLogger METHODS
     ##########################################################################
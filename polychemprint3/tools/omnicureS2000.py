@@ -14,23 +14,51 @@ import numpy as np
 
 from polychemprint3.tools.toolSpec import toolSpec
 from polychemprint3.utility.serialDeviceSpec import serialDeviceSpec
+from polychemprint3.utility import serialRegistry
 import serial
-import io
 import time
 import logging
 import crcmod.predefined
 
+# CRC-8/MAXIM function (and its table), built once per process
+crc8Maxim = crcmod.predefined.mkCrcFun('crc-8-maxim')
+
+
+def packFrame(cmdString):
+    """*Packages a command into a frame ready to write*.
+
+    Parameters
+    ----------
+    cmdString: String
+        input command string as per Omnicure user manual section 16
+
+    Returns
+    -------
+    bytes
+        CommandString + CRC-8 (2 char uppercase hex) + carriage return
+    """
+    cmdBytes = cmdString.encode()
+    return cmdBytes + b'%02X' % crc8Maxim(cmdBytes) + b'\r'
+
+
+# Frames of the fixed commands, packaged once (shutter, connection, iris %)
+fixedFrames = {cmdString: packFrame(cmdString) for cmdString in
+               ['OPN', 'CLS', 'CONN', 'DCON', 'TRG']
+               + ['SIL' + str(level) for level in range(1, 101)]}
+
 
 class omnicureS2000(serialDeviceSpec, toolSpec):
     """Implements the toolSpec abstract base class for the Excelitas/Lumen Dynamics Omnicure S2000."""
 
+    defaultBaudRate = 19200
+
     ### CONSTRUCT/DESTRUCT METHODS
 
     def __init__(self,
                  name="T_OmnicureS2000",
                  units="percent",
                  devAddress="/dev/ttyUSB0",
-                 baudRate=19200,
+                 baudRate=None,
                  commsTimeOut=0.1,
                  __verbose__=1,
                  **kwargs):
@@ -45,13 +73,15 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         devAddress: String
             device address on this computer
         baudRate: int
-            baud rate
+            baud rate, None for the saved/default rate
         commsTimeOut: int
             how long to wait for serial device before timeout on reads
         verbose: bool
             whether details should be printed to cmd line
         """
         self.dispenseStatus = 0  # off
+        self.lastLatency = None  # seconds from last command write to reply
+        self.exposureTime = None  # unit's exposure time setting, 0.1 s steps
         inputs = {"name": name,
                   "units": units,
                   "devAddress": devAddress,
@@ -77,6 +107,7 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         """
         passed = False
         print("\t\t\t" + "Activating Omnicure S2000.")
+        self.exposureTime = None  # unknown until set again
 
         # Start Serial Device
         [status, message] = self.startSerial()
@@ -145,9 +176,12 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         """
         try:
             if self.dispenseStatus == 0:
-                self.writeSerialCommand("OPN")
-                self.dispenseStatus = 1
-                return [1, "UV Shutter Opened."]
+                [status, message] = self.writeSerialCommand("OPN")
+                self.dispenseStatus = 1  # assume open unless confirmed closed
+                if status != 1:
+                    return [-1, "UV Shutter open not confirmed: " + message]
+                return [1, "UV Shutter Opened. (%.1f ms)"
+                        % (self.lastLatency * 1000)]
 
             else:
                 return [0, "Warning: UV Shutter should already be on."]
@@ -165,9 +199,12 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         """
         try:
             if self.dispenseStatus == 1:
-                self.writeSerialCommand("CLS")
+                [status, message] = self.writeSerialCommand("CLS")
+                if status != 1:
+                    return [-1, "UV Shutter close not confirmed: " + message]
                 self.dispenseStatus = 0
-                return [1, "UV Shutter Closed."]
+                return [1, "UV Shutter Closed. (%.1f ms)"
+                        % (self.lastLatency * 1000)]
 
             else:
                 self.writeSerialCommand("CLS")
@@ -176,6 +213,55 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
             return [-1, 'Failed disengaging UV Shutter ' + inst.__str__()]
 
 
+    def expose(self, seconds):
+        """Open the UV shutter for a set time, timed by the Omnicure.
+
+        Sets the unit's exposure time (STM, 0.1 s steps, 0.2-999.9 s) if it
+        changed and triggers a timed exposure (TRG). The unit closes the
+        shutter itself, the call returns once the exposure has ended.
+        Times the unit can't run exactly are timed by the host instead
+        (toolSpec.expose), so the dose is never changed.
+
+        Parameters
+        ----------
+        seconds: float
+            exposure time
+
+        Returns
+        -------
+        status : two-element list
+            First element (int) indicates whether exposure was successful
+            (1) or error (-1).
+            Second element (String) provides text explanation.
+        """
+        try:
+            if self.dispenseStatus == 1:
+                return [-1, "UV Shutter is open, close it before a timed "
+                            "exposure."]
+
+            # Exposure time in tenths of seconds, within unit's range
+            tenths = int(round(float(seconds) * 10))
+            if (abs(tenths - float(seconds) * 10) > 1e-6
+                    or not 2 <= tenths <= 9999):
+                return super().expose(seconds)
+            if tenths != self.exposureTime:
+                [status, message] = self.writeSerialCommand("STM" + str(tenths))
+                if status != 1:
+                    self.exposureTime = None
+                    return [-1, "Exposure time not set: " + message]
+                self.exposureTime = tenths
+
+            [status, message] = self.writeSerialCommand("TRG")
+            if status != 1:
+                return [-1, "UV Exposure not triggered: " + message]
+
+            # Unit runs the exposure, only wait it out
+            time.sleep(tenths / 10)
+            return [1, "UV Exposure of %.1f s timed by Omnicure. (%.1f ms "
+                       "trigger)" % (tenths / 10, self.lastLatency * 1000)]
+        except Exception as inst:
+            return [-1, 'Failed UV Exposure ' + inst.__str__()]
+
     def setValue(self, intVal):
         """Set the Omnicure Output Intensity
 
@@ -234,8 +320,10 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
 
             if setSuccess == True:
                 print("\t\tValue Set Successfully for OmnicureS2000!")
+                return [1, "Intensity set: " + str(intVal)]
             else:
                 print("Omnicure Value Set Error: " + repr(response))
+                return [-1, "Error: Intensity could not be set: " + response]
 
         except Exception as inst:
             return [-1, "Error: Intensity could not be set for Extruder"
@@ -274,7 +362,7 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         return 'unset' not in connectParam
 
     def startSerial(self):
-        """*Creates and connects pySerial device*.
+        """*Connects pySerial device, reusing the port if still open*.
 
         Returns
         -------
@@ -287,18 +375,20 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         else:
             # Try to connect, catch errors and return to user
             try:
-                self.ser = serial.Serial(port=self.devAddress,
-                                         baudrate=self.baudRate,
-                                         bytesize=serial.EIGHTBITS,
-                                         parity=serial.PARITY_NONE,
-                                         stopbits=serial.STOPBITS_ONE,
-                                         timeout=0,
-                                         xonxoff=False,
-                                         rtscts=False,
-                                         dsrdtr=False,
-                                         writeTimeout=0.2
-                                         )
+                [self.ser, isNew] = serialRegistry.acquirePort(
+                    self, self.devAddress,
+                    baudrate=self.baudRate,
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE,
+                    timeout=0,
+                    xonxoff=False,
+                    rtscts=False,
+                    dsrdtr=False,
+                    write_timeout=0.2)
                 portstatus = self.ser.isOpen()
+                if not isNew:
+                    return [1, "\tReusing open PySerial Object... port open = " + str(portstatus) + "."]
                 return [1, "\tInstantiated PySerial Object... port open = " + str(portstatus) + "."]
 
                 # Use ser for writing
@@ -319,6 +409,7 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
                 #    linesIn.append(lineIn)
 
             except Exception as inst:
+                self.closeFailedPort()
                 return [-1, 'Failed Creating pySerial... ' + str(inst)]
 
     def stopSerial(self):
@@ -330,9 +421,9 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         [-1, "Error: Tool could not be stopped + error text"]
         """
         try:
-            print("\t\t\t\tClosing Tool Serial Port...")
-            self.ser.close()
-            print("\t\t\t\tClosed Tool Serial Port!")
+            # Port is kept open for reactivation (serialRegistry)
+            serialRegistry.releasePort(self, self.devAddress)
+            print("\t\t\t\tReleased Tool Serial Port!")
             return [1, "Terminated successfully"]
         except Exception as inst:
             return [0, 'Error on closing Serial Device: ' + self.name
@@ -382,8 +473,7 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         """
         if self.checkIfSerialConnectParamsSet():
             try:
-                self.ser.write(text.encode())
-                self.ser.write("\r".encode())
+                self.writeBytes((text + "\r").encode())
                 print('\t\t\t\tCommand Sent to Omnicure: ' + repr(text))
                 return [1, 'Command Sent' + text]
             except Exception as inst:
@@ -395,7 +485,10 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
                     + self.name + ' : ' + 'serial parameters unset']
 
     def writeSerialCommand(self, cmdString):
-        """Writes packaged command to serial device and receives response [doesnt validate]
+        """Writes packaged command to serial device and receives response.
+
+        Returns as soon as the reply is terminated and its CRC verified,
+        the command round trip time is kept in lastLatency.
 
         Parameters
         ----------
@@ -404,21 +497,68 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
 
         Returns
         -------
-        [1, Received Text]
+        [1, Received Text (without CRC/terminator)]
         [0, "Error sending cmd : " + self.name + ' : ' + Error']
-            if exception
+            if no valid reply or exception
         """
         try:
-            # package command string
-            self.__writeSerial__(self.pack(cmdString))
+            # Drop late replies to earlier commands
+            self.ser.reset_input_buffer()
 
-            received = self.readTime(self.commsTimeOut)
-            return [1, received[1]]
+            # packaged command frame, precomputed for fixed commands
+            tStart = time.perf_counter()
+            self.writeBytes(self.packBytes(cmdString))
+            received = self.readReply(self.commsTimeOut)
+            self.lastLatency = time.perf_counter() - tStart
+
+            if self.__verbose__:
+                print('\t\t\t\tCommand Sent to Omnicure: ' + repr(cmdString)
+                      + ' -> ' + repr(received[1])
+                      + ' (%.1f ms)' % (self.lastLatency * 1000))
+            if received[0] == 1:
+                return [1, received[1]]
+            return [0, 'Error on sending command to Serial Device: '
+                    + self.name + ' : ' + received[1]]
 
         except Exception as inst:
             return [0, 'Error on sending command to Serial Device: '
                     + self.name + ' : ' + str(inst)]
 
+    def readReply(self, timeout):
+        """*Reads one reply, returns as soon as it is terminated*.
+
+        A reply is Text + CRC-8 (2 char hex) + carriage return, timeout is
+        only an upper bound.
+
+        Parameters
+        ----------
+        timeout: float
+            max seconds to wait for the reply
+
+        Returns
+        -------
+        [1, reply Text] if terminated and CRC matches
+        [0, 'Timed out/CRC mismatch, Received: + text']
+        [-1, 'Read failed + Error'] if exception caught
+        """
+        tStart = time.perf_counter()
+        try:
+            if self.ser.timeout != timeout:
+                self.ser.timeout = timeout
+            raw = self.ser.read_until(b'\r')
+            self.recordWait(time.perf_counter() - tStart)
+
+            if not raw.endswith(b'\r'):
+                return [0, 'Timed out, Received: ' + repr(raw)]
+            frame = raw.strip()
+            text = frame[:-2]
+            if frame[-2:] != b'%02X' % crc8Maxim(text):
+                return [0, 'CRC mismatch, Received: ' + repr(raw)]
+            return [1, text.decode()]
+        except Exception as inst:
+            return [-1, 'Error on read from Serial Device ' + self.name
+                    + ' : ' + str(inst)]
+
     def readTime(self, timeout):
         """*Reads in from serial device until timeout*.
 
@@ -493,14 +633,7 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
         # Googled "CRC Python Packages" until I found one that implements CRC-8 MAXIM
         # http://crcmod.sourceforge.net/crcmod.predefined.html
 
-        encodedString = checkString.encode()
-        crc8_func = crcmod.predefined.mkCrcFun('crc-8-maxim')
-        hexCRC8 = hex(crc8_func(encodedString))
-
-        crc8String = str(hexCRC8)[2:].upper()
-        if len(crc8String) < 2:
-            crc8String = "0" + crc8String
-        return crc8String
+        return '%02X' % crc8Maxim(checkString.encode())
 
     def pack(self, cmdString):
         """Packages a command packet to send to the Omnicure S2000 over RS232
@@ -517,12 +650,26 @@ class omnicureS2000(serialDeviceSpec, toolSpec):
             packaged command string to send to omnicure
         """
 
-        # Calculate CRC-8 Value
-        crc8String = self.calcCRC8Maxim(cmdString)
+        # Frame without the terminating carriage return
+        return self.packBytes(cmdString)[:-1].decode()
+
+    def packBytes(self, cmdString):
+        """Packages a command frame as bytes, including the terminator.
+
+        Parameters
+        ----------
+        cmdString: String
+            input command string as per Omnicure user manual section 16
 
-        # Compose output string and return
-        outString = cmdString + crc8String
-        return outString
+        Returns
+        -------
+        bytes
+            CommandString + CRC-8 + carriage return, ready to write
+        """
+        frame = fixedFrames.get(cmdString)
+        if frame is None:
+            frame = packFrame(cmdString)
+        return frame
 
     def unpack(self, packetIn):
         """Unpacks a command packet for cmd name and value*.
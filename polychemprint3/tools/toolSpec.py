@@ -8,11 +8,23 @@
 """
 
 # Imports ####################################################################
+import statistics
+import time
 from abc import ABC, abstractmethod
+from pathlib import Path
+import yaml
 from polychemprint3.utility.loggerSpec import loggerSpec
+from polychemprint3.tools.asyncToolSpec import asyncToolSpec
 
+# Tool methods allowed in submitBatch action lists
+batchActions = ('engage', 'disengage', 'setValue', 'expose')
 
-class toolSpec(loggerSpec, ABC):
+# Calibrated command-to-effect latency per tool name, see calibrateLatency
+latencyConfigPath = (Path(__file__).absolute().parent.parent / 'data'
+                     / 'toolLatency.yaml')
+
+
+class toolSpec(loggerSpec, asyncToolSpec, ABC):
     """Abstract Base Class for all dispensing/writing tool drivers."""
 
     # Construct/Destruct Methods #############################################
@@ -30,6 +42,8 @@ class toolSpec(loggerSpec, ABC):
         self.units = units
         self.__verbose__ = __verbose__
 
+        self.loadLatency()
+
         super().__init__(**kwargs)
 
     @abstractmethod
@@ -107,6 +121,50 @@ class toolSpec(loggerSpec, ABC):
         """
         pass
 
+    def expose(self, seconds):
+        """Turn tool primary action on for a set time, then off.
+
+        By default timed on the host (engage, sleep, disengage), tools with
+        a hardware timer override it to time the exposure on the device.
+
+        Parameters
+        ----------
+        seconds: float
+            how long the tool should be on
+
+        Returns
+        -------
+        status : two-element list
+            First element (int) indicates whether exposure was successful
+            (1) or error (-1).
+            Second element (String) provides text explanation.
+        """
+        status = self.engage()
+        if status[0] == -1:
+            return status
+        time.sleep(float(seconds))
+        return self.disengage()
+
+    def attachAxes(self, axes):
+        """Gives the tool the active axes before a sequence/recipe runs.
+
+        Tools whose commands are written into the axes G-code stream (and
+        so run in planner order) keep the axes, by default tools are
+        commanded directly and ignore it.
+
+        Parameters
+        ----------
+        axes: Axes3DSpec
+            active axes
+
+        Returns
+        -------
+        bool
+            True if tool commands are queued in the axes stream (no motion
+            barrier needed before them), False if sent to the tool
+        """
+        return False
+
     @abstractmethod
     def getState(self):
         """Returns the current dispense/action state (on/off).
@@ -119,6 +177,133 @@ class toolSpec(loggerSpec, ABC):
         """
         pass
 
+    # Batch Methods ##########################################################
+    def submitBatch(self, actions):
+        """Queues a list of timed tool actions and returns at once.
+
+        The actions run in order in the tool's worker thread (see runBatch).
+
+        Parameters
+        ----------
+        actions: list
+            [seconds, action, args...] entries, seconds counted from the
+            batch start, action one of engage, disengage, setValue, expose
+            e.g. [[0, "setValue", "20"], [0.5, "setValue", "25"]]
+
+        Returns
+        -------
+        concurrent.futures.Future
+            batch handle, result() gives the status list of each action
+        """
+        return self.getWorker().submit(self.runBatch, list(actions))
+
+    def runBatch(self, actions):
+        """Runs a list of timed tool actions, blocking until done.
+
+        Generic fallback calling each action in turn, drivers able to
+        pipeline commands override it.
+
+        Parameters
+        ----------
+        actions: list
+            [seconds, action, args...] entries, see submitBatch
+
+        Returns
+        -------
+        list
+            status : two-element list of each action, in order
+        """
+        results = []
+        tStart = time.perf_counter()
+        for action in actions:
+            delay = tStart + action[0] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if action[1] not in batchActions:
+                results.append([-1, "Unknown batch action: " + str(action[1])])
+                continue
+            results.append(getattr(self, action[1])(*action[2:]))
+        return results
+
+    # Latency Methods ########################################################
+    def calibrateLatency(self, nTrials=5, actuationDelay=None):
+        """Measures the tool's command round trip and saves its lead time.
+
+        Times nTrials engage/disengage pairs (the tool must be active and
+        safe to actuate). The physical actuation delay after the command
+        is acknowledged (pneumatic lag, shutter travel) cannot be seen
+        from the host, it is measured externally and passed in.
+
+        Parameters
+        ----------
+        nTrials: int
+            number of engage/disengage pairs to time
+        actuationDelay: float
+            seconds from acknowledged command to effect, None keeps the
+            saved value
+
+        Returns
+        -------
+        [float, list]
+            lead time in seconds (None if a command failed), call durations
+        """
+        if not hasattr(self, 'actuationDelay'):  # loaded from older logs
+            self.loadLatency()
+        durations = []
+        for trial in range(nTrials):
+            for action in [self.engage, self.disengage]:
+                tStart = time.perf_counter()
+                status = action()
+                durations.append(time.perf_counter() - tStart)
+                if status[0] == -1:
+                    print("\t\t\tLatency calibration failed: " + status[1])
+                    return [None, durations]
+
+        self.roundTripLatency = statistics.median(durations)
+        if actuationDelay is not None:
+            self.actuationDelay = float(actuationDelay)
+        print("\t\t\t%s: round trip %.1f ms, actuation %.1f ms"
+              % (self.name, self.roundTripLatency * 1000,
+                 self.actuationDelay * 1000))
+
+        config = loadLatencyConfig()
+        config[self.name] = {'roundTrip': float(self.roundTripLatency),
+                             'actuationDelay': float(self.actuationDelay),
+                             'calibrated': time.strftime("%Y%m%d_%H%M%S")}
+        with open(latencyConfigPath, 'w') as latencyFile:
+            yaml.dump(config, latencyFile)
+        return [self.getLeadTime(), durations]
+
+    def loadLatency(self):
+        """Sets roundTripLatency/actuationDelay from the saved calibration.
+
+        Tools without a saved calibration get 0 for both.
+        """
+        saved = loadLatencyConfig().get(self.name, {})
+        self.roundTripLatency = saved.get('roundTrip', 0.0)
+        self.actuationDelay = saved.get('actuationDelay', 0.0)
+
+    def getLeadTime(self, synced=True):
+        """Returns how long before its effect a tool command must be sent.
+
+        Parameters
+        ----------
+        synced: bool
+            whether the axes stop (waitMotionDone) before the command is
+            sent, as in sequences and recipes. The round trip then passes
+            while the axes wait, only the actuation delay needs a lead.
+
+        Returns
+        -------
+        float
+            seconds, actuation delay (+ round trip if not synced)
+        """
+        if not hasattr(self, 'roundTripLatency'):  # loaded from older logs
+            self.loadLatency()
+        if synced:
+            return self.actuationDelay
+        return self.roundTripLatency + self.actuationDelay
+
     # Logging methods #########################################################
     @abstractmethod
     def writeLogSelf(self):
@@ -142,3 +327,19 @@ class toolSpec(loggerSpec, ABC):
 
         """
         super().loadLogSelf(yamlString)
+
+
+def loadLatencyConfig():
+    """*Returns the saved latency calibration of all tools*.
+
+    Returns
+    -------
+    dict
+        tool name: {'roundTrip': float, 'actuationDelay': float, ...},
+        empty if nothing saved
+    """
+    try:
+        with open(latencyConfigPath, 'r') as latencyFile:
+            return yaml.load(latencyFile, Loader=yaml.Loader) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
@@ -14,15 +14,19 @@ import numpy as np
 
 from polychemprint3.tools.toolSpec import toolSpec
 from polychemprint3.utility.serialDeviceSpec import serialDeviceSpec
+from polychemprint3.utility import serialRegistry
 import serial
-import io
 import time
 import logging
+from collections import OrderedDict
 
 
 class ultimusExtruder(serialDeviceSpec, toolSpec):
     """Implements the toolSpec abstract base class for the Nordson EFD Ultimus V Extruder."""
 
+    __transientAttributes__ = serialDeviceSpec.__transientAttributes__ + [
+        'packetCache']
+
     ###########################################################################
     ### Construct/Destruct METHODS
     ###########################################################################
@@ -30,9 +34,12 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
                  name="T_UltimusExtruder",
                  units="kPa",
                  devAddress="/dev/ttyS0",
-                 baudRate=115200,
+                 baudRate=None,
                  commsTimeOut=0.1,
                  __verbose__=1,
+                 packetCacheSize=256,
+                 batchPipelining=False,
+                 batchSessionHold=0.5,
                  **kwargs):
         """*Initializes T_UltimusExtruder Object*.
 
@@ -45,13 +52,24 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         devAddress: Strong
             device address on this computer
         baudRate: int
-            baud rate
+            baud rate, None for the saved/default rate
         commsTimeOut: int
             how long to wait for serial device before timeout on reads
         verbose: bool
             whether details should be printed to cmd line
+        packetCacheSize: int
+            max number of encoded pressure packets kept for reuse
+        batchPipelining: bool
+            whether runBatch sends several commands in one ENQ...EOT
+            session (not verified on all Ultimus models), see runBatch
+        batchSessionHold: float
+            longest wait (s) between pipelined commands that keeps the
+            ENQ...EOT session open, see runBatch
         """
         self.dispenseStatus = 0  # off
+        self.packetCacheSize = packetCacheSize
+        self.batchPipelining = batchPipelining
+        self.batchSessionHold = batchSessionHold
         inputs = {"name": name,
                   "units": units,
                   "devAddress": devAddress,
@@ -170,8 +188,8 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         """
         print("\t\tSetting Value for UltimusExtruder...")
         try:
-            pressureVal = self.pressureRecode(pressureVal)
-            return self.writeSerialCommand("PS  " + pressureVal)
+            [packet, presRft] = self.getPressurePacket(pressureVal)
+            return self.sendPacket(packet, "PS  " + presRft)
         except Exception as inst:
             return [-1, "Error: Pressure could not be set for Extruder"
                     + inst.__str__()]
@@ -197,6 +215,76 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
             return [-1, "Error: Tool activation state cannot be determined"
                     + inst.__str__()]
 
+    def runBatch(self, actions):
+        """Runs timed setValue/engage/disengage actions with cached packets.
+
+        Each command is its own ENQ...EOT exchange. With batchPipelining,
+        commands instead follow each other after a single ENQ, each still
+        waiting for its A0 (an A2 ends the batch session), and one EOT ends
+        the batch. The session is then closed while waiting longer than
+        batchSessionHold for the next action. Batches with other actions use
+        the generic toolSpec.runBatch.
+
+        Parameters
+        ----------
+        actions: list
+            [seconds, action, args...] entries, see toolSpec.submitBatch
+
+        Returns
+        -------
+        list
+            status : two-element list of each action, in order
+        """
+        if any(action[1] not in ("setValue", "engage", "disengage")
+               for action in actions):
+            return super().runBatch(actions)
+
+        results = []
+        inSession = False
+        tStart = time.perf_counter()
+        try:
+            for action in actions:
+                delay = tStart + action[0] - time.perf_counter()
+                if inSession and delay > self.batchSessionHold:
+                    self.writeBytes(b'\x04')  # end transmission
+                    inSession = False
+                if delay > 0:
+                    time.sleep(delay)
+
+                # Dispense toggles are skipped when already in that state
+                if action[1] == "setValue":
+                    [packet, presRft] = self.getPressurePacket(action[2])
+                    packet = packet[1:]
+                    cmdString = "PS  " + presRft
+                elif (action[1] == "engage") == (self.dispenseStatus == 0):
+                    packet = self.packBytes("DI")
+                    cmdString = "DI"
+                else:
+                    results.append([0, "Warning: Dispense should already be "
+                                    + ("on." if self.dispenseStatus else "off.")])
+                    continue
+
+                status = self.sendPacket(
+                    packet if inSession else b'\x05' + packet, cmdString,
+                    endSession=not self.batchPipelining)
+                inSession = self.batchPipelining and status[0] == 1
+                if status[0] != 1:
+                    self.writeBytes(b'\x04')
+                    results.append([-1, status[1]])
+                elif cmdString == "DI":
+                    self.dispenseStatus = 1 - self.dispenseStatus
+                    results.append([1, "Dispense turned "
+                                    + ("on." if self.dispenseStatus else "off.")])
+                else:
+                    results.append(status)
+        except Exception as inst:
+            results.append([-1, "Error running batch on: " + self.name + ' : '
+                            + inst.__str__()])
+        finally:
+            if inSession:
+                self.writeBytes(b'\x04')
+        return results
+
     ##########################################################################
     ### PCP_SerialDevice METHODS
     ##########################################################################
@@ -213,7 +301,7 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         return 'unset' not in connectParam
 
     def startSerial(self):
-        """*Creates and connects pySerial device*.
+        """*Connects pySerial device, reusing the port if still open*.
 
         Returns
         -------
@@ -226,21 +314,24 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         else:
             # Try to connect, catch errors and return to user
             try:
-                self.ser = serial.Serial(port=self.devAddress,
-                                         baudrate=self.baudRate,
-                                         bytesize=serial.EIGHTBITS,
-                                         parity=serial.PARITY_NONE,
-                                         stopbits=serial.STOPBITS_ONE,
-                                         timeout=0,
-                                         xonxoff=False,
-                                         rtscts=False,
-                                         dsrdtr=False,
-                                         writeTimeout=2
-                                         )
+                [self.ser, isNew] = serialRegistry.acquirePort(
+                    self, self.devAddress,
+                    baudrate=self.baudRate,
+                    bytesize=serial.EIGHTBITS,
+                    parity=serial.PARITY_NONE,
+                    stopbits=serial.STOPBITS_ONE,
+                    timeout=0,
+                    xonxoff=False,
+                    rtscts=False,
+                    dsrdtr=False,
+                    write_timeout=2)
                 portstatus = self.ser.isOpen()
+                if not isNew:
+                    return [1, "\tReusing open PySerial Object... port open = " + str(portstatus) + "."]
                 return [1, "\tInstantiated PySerial Object... port open = " + str(portstatus) + "."]
 
             except Exception as inst:
+                self.closeFailedPort()
                 return [-1, 'Failed Creating pySerial... ' + str(inst)]
 
     def stopSerial(self):
@@ -253,10 +344,9 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         """
         try:
             self.ser.write(chr(0x04).encode())  # End of transmission code
-            print("\t\tClosing UltimusV...")
-            time.sleep(3)
-            self.ser.close()
-            print("\t\tClosed UltimusV!\n")
+            # Port is kept open for reactivation (serialRegistry)
+            serialRegistry.releasePort(self, self.devAddress)
+            print("\t\tReleased UltimusV!\n")
             return [1, "Terminated successfully"]
         except Exception as inst:
             return [0, 'Error on closing Serial Device: ' + self.name
@@ -282,7 +372,7 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
             self.__writeSerial__(chr(0x05))
 
             # read response, see if matches acknowledge
-            readIn = self.readTime(3)[1]
+            readIn = self.readFrame(3)[1]
             if chr(6) in readIn:
                 return [1, "Handshake Successful, Received ACK"]
             else:
@@ -307,7 +397,7 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         """
         if self.checkIfSerialConnectParamsSet():
             try:
-                self.ser.write(text.encode())
+                self.writeBytes(text.encode())
                 print('\t\t\t\tCommand Sent to Extruder: ' + text)
                 return [1, 'Command Sent' + text]
             except Exception as inst:
@@ -325,6 +415,28 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         cmdString
             the string to send
 
+        Returns
+        -------
+        [1, 'Command Sent: ' + cmdString + 'Received: ' + rcvd]
+        [0, "Error sending cmd : " + self.name + ' : ' + Error']
+            if exception
+        """
+        return self.sendPacket(b'\x05' + self.packBytes(cmdString), cmdString)
+
+    def sendPacket(self, payload, cmdString, endSession=True):
+        """*Writes an encoded ENQ + command packet, waits for the reply*.
+
+        Parameters
+        ----------
+        payload: bytes
+            ENQ followed by the packaged command (see packBytes), or just
+            the packaged command inside an open session
+        cmdString: String
+            the unpackaged command, for status messages
+        endSession: bool
+            whether to send EOT after a successful reply (False keeps the
+            session open for the next command, see runBatch)
+
         Returns
         -------
         [1, 'Command Sent: ' + cmdString + 'Received: ' + rcvd]
@@ -332,23 +444,25 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
             if exception
         """
         try:
-            # package command string
-            self.__writeSerial__(chr(0x05))
-            self.__writeSerial__(self.pack(cmdString))
+            # ENQ and packaged command string in one write
+            self.writeBytes(payload)
+            if self.__verbose__:
+                print('\t\t\t\tCommand Sent to Extruder: ' + repr(payload))
 
-            # receive A0 or A2
-            received = self.readTime(self.commsTimeOut)[1]
+            # receive A0 or A2, returns as soon as the frame is complete
+            received = self.readFrame(self.commsTimeOut, stopOnAck=False)[1]
             if "A2" in received:
                 return [0, "Error sending command to Serial Device: "
                         + self.name + ' : ' + 'received A2']
 
             else:
                 if "A0" in received:  # send ACK
-                    self.__writeSerial__(chr(0x04))
+                    if endSession:
+                        self.__writeSerial__(chr(0x04))
                     return [1, 'Command Sent Successfully: ' + cmdString + '-> Received Confirmation: '
                             + received]
                 else:
-                    self.__writeSerial__(chr(0x04).encode())  # end transmission
+                    self.__writeSerial__(chr(0x04))  # end transmission
                     return [0, "Unexpected return from Serial Device: "
                             + self.name + ' : ' + received]
 
@@ -383,6 +497,63 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
             return [0, 'Error on read from Serial Device: ' + self.name
                     + ' : ' + str(inst)]
 
+    def readFrame(self, timeout, stopOnAck=True):
+        """*Reads one reply, returns as soon as it is complete*.
+
+        A reply is an ACK/NAK byte or an STX...ETX framed packet, timeout is
+        only an upper bound.
+
+        Parameters
+        ----------
+        timeout: float
+            max seconds to wait for the reply
+        stopOnAck: bool
+            whether an ACK ends the read, False skips it (ACK to the ENQ)
+            and waits for the framed reply
+
+        Returns
+        -------
+        [1, reply String (ACK, NAK or frame including STX/ETX)]
+        [0, partial String read in] if timed out
+        [-1, 'Read failed + Error'] if exception caught
+        """
+        frame = ''
+        inFrame = False
+        tStart = time.perf_counter()
+        tEnd = tStart + timeout
+        try:
+            portTimeOut = self.ser.timeout
+            while True:
+                remaining = tEnd - time.perf_counter()
+                if remaining <= 0:
+                    result = [0, frame]
+                    break
+                # One blocking read, returns as soon as a byte arrives
+                self.ser.timeout = remaining
+                char = self.ser.read(1).decode('latin-1')
+                if char == '':
+                    continue
+                if char == chr(2):  # STX
+                    inFrame = True
+                    frame = char
+                elif inFrame:
+                    frame += char
+                    if char == chr(3):  # ETX
+                        result = [1, frame]
+                        break
+                elif char == chr(0x15) or (char == chr(6) and stopOnAck):
+                    result = [1, char]
+                    break
+            self.ser.timeout = portTimeOut
+            self.recordWait(time.perf_counter() - tStart)
+            if self.__verbose__:
+                print('\t\t\t\tReceived from Serial Device: ' + self.name
+                      + ' : ' + repr(result[1]))
+            return result
+        except Exception as inst:
+            return [-1, 'Error on read from Serial Device: ' + self.name
+                    + ' : ' + str(inst)]
+
     ##########################################################################
     ### PCP_BasicLogger METHODS
     ##########################################################################
@@ -441,12 +612,24 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         | *Returns*
         |    Capitalized hex string of length 2
         """
-        checkTotal = 0
-        for char in checkString:
-            checkTotal -= int(hex(ord(char)), 16)
-        # convert to hex string
-        hexTotal = self.decToHex(checkTotal, 32).upper()
-        return hexTotal[-2:]
+        return self.calcCheckSumBytes(checkString.encode('latin-1')).decode()
+
+    def calcCheckSumBytes(self, data):
+        """*Calculates checksum of raw bytes*.
+
+        Logic: subtract byte values from 0 and output least significant byte
+
+        Parameters
+        ----------
+        data: bytes
+            bytes to compute checksum from
+
+        Returns
+        -------
+        bytes
+            capitalized ascii hex of length 2
+        """
+        return b'%02X' % (-sum(data) & 0xFF)
 
     def pack(self, cmdString):
         """*Packages a command packet*.
@@ -464,27 +647,62 @@ class ultimusExtruder(serialDeviceSpec, toolSpec):
         String
             packaged command string to send to extruder
         """
-        cmdName = cmdString[0:4]
-        cmdData = cmdString[4:]
-
-        # Create NumBytesField
-        # hex number of format 0x# or 0x##
-        nBytes = len(cmdName + cmdData)
-        # convert to hex string remove 0x and add leading 0 if nBytes < 16
-        if nBytes < 16:
-            nBytes = hex(nBytes)[2:].upper()
-            nBytes = '0' + nBytes
-        else:
-            nBytes = hex(nBytes)[2:].upper()
+        return self.packBytes(cmdString).decode('latin-1')
 
-        # create Data string
-        dataString = nBytes + cmdName + cmdData
+    def packBytes(self, cmdString):
+        """*Packages a command packet, encoded for writing*.
 
-        # Calculate Checksum
-        checkSum = self.calc_checkSum(dataString)
+        Parameters
+        ----------
+        cmdString: String
+            input command string, first 4 char are cmdName, rest are data
+
+        Returns
+        -------
+        bytes
+            STX + NumBytes + CommandName + CommandData + Checksum + ETX
+        """
+        cmdBytes = cmdString.encode('latin-1')
+
+        # NumBytes field is 2 char uppercase hex
+        dataBytes = b'%02X' % len(cmdBytes) + cmdBytes
+
+        # Add Checksum and Start/End transmission characters
+        return b'\x02' + dataBytes + self.calcCheckSumBytes(dataBytes) + b'\x03'
+
+    def getPressurePacket(self, pressureVal):
+        """*Returns the encoded ENQ + PS packet for a pressure value*.
+
+        Packets are kept in a bounded LRU cache keyed on the value as
+        passed in, so repeated pressures are a dictionary lookup instead of
+        a recode and re-encode.
+
+        Parameters
+        ----------
+        pressureVal: String
+            pressure as given to setValue, e.g. "23.4"
+
+        Returns
+        -------
+        [bytes, String]
+            ENQ + packaged "PS  " command ready to write, 4 char pressure
+            from pressureRecode
+        """
+        entry = self.packetCache.get(pressureVal)
+        if entry is None:
+            presRft = self.pressureRecode(pressureVal)
+            entry = [b'\x05' + self.packBytes("PS  " + presRft), presRft]
+            self.packetCache[pressureVal] = entry
+            if len(self.packetCache) > self.packetCacheSize:
+                self.packetCache.popitem(last=False)
+        else:
+            self.packetCache.move_to_end(pressureVal)
+        return entry
 
-        # Add Start/End transmission characters and return
-        return chr(2) + dataString + checkSum + chr(3)
+    def __initTransient__(self):
+        """*Creates reader state and an empty packet cache*."""
+        super().__initTransient__()
+        self.packetCache = OrderedDict()  # value: [packet, presRft], LRU order
 
     def unpack(self, packetIn):
         """*Unpacks a command packet for cmd name and value*.
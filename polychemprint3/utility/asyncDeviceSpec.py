@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""Interface shared by hardware objects that can be driven from asyncio.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+from abc import ABC
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import weakref
+
+# One worker thread per device keeps each device's commands in order while
+# different devices run side by side. Kept outside the objects so they stay
+# loggable/copyable.
+deviceWorkers = weakref.WeakKeyDictionary()
+deviceWorkersLock = threading.Lock()
+
+# Event loop thread used by runSync when called from blocking code
+syncLoop = None
+syncLoopLock = threading.Lock()
+
+
+class asyncDeviceSpec(ABC):
+    """Abstract Base Class for devices with coroutine (async) methods."""
+
+    async def runBlocking(self, func, *args):
+        """*Runs a blocking driver call in this device's worker thread*.
+
+        Parameters
+        ----------
+        func: callable
+            blocking method to run
+        args
+            arguments passed to func
+
+        Returns
+        -------
+        Whatever func returns
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.getWorker(), func, *args)
+
+    def getWorker(self):
+        """*Returns this device's worker thread, creating it if needed*.
+
+        Returns
+        -------
+        ThreadPoolExecutor
+            single thread executor running this device's commands in order
+        """
+        with deviceWorkersLock:
+            worker = deviceWorkers.get(self)
+            if worker is None:
+                worker = ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix=str(getattr(self, 'name', 'device')))
+                deviceWorkers[self] = worker
+        return worker
+
+
+def runSync(coro):
+    """*Runs a coroutine to completion from blocking code (sync adapter)*.
+
+    The coroutine runs on a background event loop shared by all callers, so
+    devices awaited from it keep their loop-bound state between calls.
+
+    Parameters
+    ----------
+    coro: coroutine
+        e.g. axes.moveAsync("G1 X1\\n")
+
+    Returns
+    -------
+    Whatever the coroutine returns
+    """
+    global syncLoop
+    with syncLoopLock:
+        if syncLoop is None or syncLoop.is_closed():
+            syncLoop = asyncio.new_event_loop()
+            threading.Thread(target=syncLoop.run_forever,
+                             name="PCP async loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, syncLoop).result()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Interface for serial devices that can be awaited from an asyncio loop.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+"""
+from abc import ABC
+import asyncio
+import time
+from polychemprint3.utility.serialDeviceSpec import serialDeviceSpec
+
+
+class asyncSerialDeviceSpec(serialDeviceSpec, ABC):
+    """Abstract Base Class for serial devices with a non-blocking transport.
+
+    Replies are read by the background reader thread, coroutines await them
+    without ever blocking the event loop on the serial port.
+    """
+
+    __transientAttributes__ = serialDeviceSpec.__transientAttributes__ + [
+        'aioWaiters']
+
+    def __initTransient__(self):
+        """*Creates (stopped) background reader state*."""
+        super().__initTransient__()
+        self.aioWaiters = []  # [loop, asyncio.Event] of awaiting coroutines
+
+    def queueMessage(self, msg):
+        """*Queues msg like serialDeviceSpec and wakes awaiting coroutines*.
+
+        Parameters
+        ----------
+        msg: String
+            message read in
+
+        Returns
+        -------
+        String
+            message kind
+        """
+        kind = super().queueMessage(msg)
+        with self.rxCondition:
+            waiters = list(self.aioWaiters)
+        for [loop, event] in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # loop already closed
+                pass
+        return kind
+
+    async def awaitMessage(self, kinds=None, timeout=None):
+        """*Awaits a message of one of kinds, or timeout*.
+
+        Needs the background reader (startReader) to be running.
+
+        Parameters
+        ----------
+        kinds: list
+            message kinds to accept, None for all
+        timeout: float
+            seconds to wait, None to wait indefinitely
+
+        Returns
+        -------
+        [kind, message]
+            oldest queued message of the requested kinds
+        [None, ""]
+            timed out
+        """
+        self.flushWrites()  # a reply can't arrive for an unsent command
+        tStart = time.perf_counter()
+        waiter = [asyncio.get_running_loop(), asyncio.Event()]
+        with self.rxCondition:
+            self.aioWaiters.append(waiter)
+        try:
+            while True:
+                waiter[1].clear()
+                result = self.popMessage(kinds)
+                if result[0] is not None or not self.isReaderRunning():
+                    break
+                remaining = None
+                if timeout is not None:
+                    remaining = tStart + timeout - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    result = self.popMessage(kinds)
+                    break
+        finally:
+            with self.rxCondition:
+                self.aioWaiters.remove(waiter)
+        self.recordWait(time.perf_counter() - tStart)
+        return result
+
+    async def writeAsync(self, text):
+        """*Writes text to the device without waiting for a reply*.
+
+        Parameters
+        ----------
+        text: String
+            message to send
+
+        Returns
+        -------
+        Same as __writeSerial__
+        """
+        return self.__writeSerial__(text)
@@ -6,26 +6,109 @@
 | Author: Bijal Patel
 """
 from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+import logging
+import threading
+import time
 import serial
+import yaml
+from polychemprint3.utility import serialRegistry
+
+# Negotiated link settings per devAddress, see probeBaudRates
+linkConfigPath = (Path(__file__).absolute().parent.parent / 'data'
+                  / 'serialLinks.yaml')
 
 
 class serialDeviceSpec(ABC):
     """Abstract Base Class for all objects using serial device."""
 
-    def __init__(self, devAddress, baudRate, commsTimeOut, **kwargs):
+    # Live reader objects, unsent writes and caches, left out of logs/copies
+    __transientAttributes__ = ['rxThread', 'rxStop', 'rxCondition',
+                               'rxQueues', 'rxCount', 'txBuffer']
+
+    # Rate used when none is given and none was saved by probeBaudRates
+    defaultBaudRate = 115200
+
+    def __init__(self, devAddress, baudRate, commsTimeOut,
+                 rxQueueLength=1000, txBatchSize=64, **kwargs):
         """*Initializes Tool Object*.
 
         Parameters
         ----------
         name : String
             device name
+        baudRate: int
+            None uses the rate saved by probeBaudRates for devAddress, or
+            defaultBaudRate if none was saved
+        rxQueueLength: int
+            max number of unread messages kept per message kind by the
+            background reader
+        txBatchSize: int
+            bytes collected before a batched write is sent (one USB
+            full-speed packet by default), see setWriteBatching
         """
         self.devAddress = devAddress
+        # A rate found by probeBaudRates replaces the default, never a rate
+        # chosen by the caller
+        if baudRate is None:
+            baudRate = loadLinkConfig().get(devAddress, {}).get(
+                'baudRate', self.defaultBaudRate)
         self.baudRate = baudRate
         self.commsTimeOut = commsTimeOut
+        self.rxQueueLength = rxQueueLength
+        self.txBatchSize = txBatchSize
+        self.writeBatching = False
         self.ser = serial.Serial()
+        self.resetWaitStats()
+        self.__initTransient__()
         super().__init__(**kwargs)
 
+    def __getstate__(self):
+        """*Returns attributes for logging/copying without transient objects*.
+
+        Returns
+        -------
+        dict
+            copy of __dict__ without live reader objects, buffers and caches
+        """
+        state = self.__dict__.copy()
+        for key in self.__transientAttributes__:
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        """*Restores attributes from a log/copy with a stopped reader*.
+
+        Parameters
+        ----------
+        state: dict
+            attributes to restore
+        """
+        self.__dict__.update(state)
+        self.__initTransient__()
+
+    def writeLogSelf(self):
+        """*Generates yaml string of attributes, without transient objects*.
+
+        Returns
+        -------
+        String
+            log in yaml string format
+        """
+        return yaml.dump(self.__getstate__())
+
+    def loadLogSelf(self, yamlString):
+        """*Loads yaml log back into dict, with a stopped reader*.
+
+        Parameters
+        ----------
+        yamlString: String
+            yaml string to be loaded back in
+        """
+        super().loadLogSelf(yamlString)
+        self.__initTransient__()
+
     def checkIfSerialConnectParamsSet(self):
         """*Goes through connection parameters and sees if all are set*.
 
@@ -37,6 +120,210 @@ class serialDeviceSpec(ABC):
         connectParam = [self.devAddress, self.firmwareVers, self.baudRate]
         return 'unset' not in connectParam
 
+    def resetWaitStats(self):
+        """*Zeroes the counters of time spent waiting on the device*."""
+        self.waitStats = {'waitTime': 0.0, 'waitCount': 0, 'maxWait': 0.0}
+
+    def getWaitStats(self):
+        """*Returns counters of time spent blocked waiting on the device*.
+
+        Returns
+        -------
+        dict
+            waitTime: total seconds waited, waitCount: number of waits,
+            maxWait: longest single wait in seconds
+        """
+        return dict(self.waitStats)
+
+    def recordWait(self, seconds):
+        """*Adds one blocking wait on the device to the wait counters*.
+
+        Parameters
+        ----------
+        seconds: float
+            duration of the wait
+        """
+        self.waitStats['waitTime'] += seconds
+        self.waitStats['waitCount'] += 1
+        self.waitStats['maxWait'] = max(self.waitStats['maxWait'], seconds)
+
+    ##########################################################################
+    # Buffered Write Methods
+    ##########################################################################
+    def writeBytes(self, payload):
+        """*Writes one command's complete payload in a single write*.
+
+        While batching, payloads are collected and sent together once
+        txBatchSize bytes are queued or at the next sync point (flushWrites,
+        waiting for a reply).
+
+        Parameters
+        ----------
+        payload: bytes
+            everything the device needs for one command
+        """
+        if self.writeBatching:
+            self.txBuffer += payload
+            if len(self.txBuffer) >= self.txBatchSize:
+                self.flushWrites()
+        else:
+            self.ser.write(payload)
+
+    def flushWrites(self):
+        """*Sends any batched payloads in one write*."""
+        if self.txBuffer:
+            payload = bytes(self.txBuffer)
+            self.txBuffer.clear()
+            self.ser.write(payload)
+
+    def discardWrites(self):
+        """*Drops any batched payloads without sending them*.
+
+        Returns
+        -------
+        int
+            number of bytes dropped
+        """
+        dropped = len(self.txBuffer)
+        self.txBuffer.clear()
+        return dropped
+
+    def setWriteBatching(self, doBatch):
+        """*Turns batching of consecutive command writes on or off*.
+
+        Parameters
+        ----------
+        doBatch: bool
+            True to collect writes until a sync point, False to write each
+            command immediately
+
+        Returns
+        -------
+        bool
+            previous batching mode
+        """
+        wasBatching = self.writeBatching
+        if not doBatch:
+            self.flushWrites()
+        self.writeBatching = doBatch
+        return wasBatching
+
+    def probeBaudRates(self, candidates=(115200, 250000, 500000, 1000000),
+                       nCommands=50, testCommand=None, timeOut=15):
+        """*Finds the fastest working baud rate and saves it for devAddress*.
+
+        Each candidate is tried on a freshly opened port: the device must
+        pass activate() (handshake), then nCommands round trips are timed.
+        The rate with the highest throughput is kept in self.baudRate and
+        saved to data/serialLinks.yaml, later instances created without a
+        baudRate use it.
+        Call on an inactive device, it is left deactivated.
+
+        Parameters
+        ----------
+        candidates: list
+            baud rates to try
+        nCommands: int
+            number of command/reply round trips timed per rate
+        testCommand: String
+            command sent with sendCmd for timing, None times handShakeSerial
+        timeOut: float
+            max seconds for activation or timing at one rate
+
+        Returns
+        -------
+        [int, dict]
+            best baud rate (None if none worked), {rate: round trips/s or
+            None if the rate failed}
+        """
+        originalRate = self.baudRate
+        results = {}
+        for rate in candidates:
+            print("\t\t\tProbing " + str(self.devAddress) + " at "
+                  + str(rate) + " baud...")
+            serialRegistry.closePort(self.devAddress)
+            self.baudRate = rate
+            results[rate] = None
+            if not self.__runWithTimeOut__(self.activate, timeOut):
+                serialRegistry.closePort(self.devAddress)
+                continue
+
+            def timeCommands():
+                tStart = time.perf_counter()
+                for i in range(nCommands):
+                    if testCommand is None:
+                        if self.handShakeSerial()[0] != 1:
+                            return None
+                    else:
+                        self.sendCmd(testCommand)
+                return nCommands / (time.perf_counter() - tStart)
+
+            results[rate] = self.__runWithTimeOut__(timeCommands, timeOut)
+            self.deactivate()
+            serialRegistry.closePort(self.devAddress)
+            if results[rate] is not None:
+                print("\t\t\t\t%.1f round trips/s" % results[rate])
+
+        working = [rate for rate in results if results[rate] is not None]
+        if not working:
+            self.baudRate = originalRate
+            return [None, results]
+        self.baudRate = max(working, key=lambda rate: results[rate])
+        config = loadLinkConfig()
+        config[self.devAddress] = {'baudRate': self.baudRate,
+                                   'roundTripsPerSec':
+                                       float(results[self.baudRate]),
+                                   'probed': time.strftime("%Y%m%d_%H%M%S")}
+        with open(linkConfigPath, 'w') as linkFile:
+            yaml.dump(config, linkFile)
+        return [self.baudRate, results]
+
+    def __runWithTimeOut__(self, func, timeOut):
+        """*Runs func, closing the port if it hangs (e.g. wrong baud rate)*.
+
+        Drivers wait indefinitely for replies, closing the port makes the
+        blocked read fail so the worker thread exits.
+
+        Parameters
+        ----------
+        func: callable
+            blocking call taking no arguments
+        timeOut: float
+            seconds before giving up
+
+        Returns
+        -------
+        Whatever func returns, None if it timed out or raised
+        """
+        result = [None]
+
+        def worker():
+            try:
+                result[0] = func()
+            except Exception as inst:
+                print("\t\t\t\tFailed: " + inst.__str__())
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        thread.join(timeOut)
+        if thread.is_alive():
+            print("\t\t\t\tNo answer, giving up on this rate")
+            self.stopReader()
+            serialRegistry.closePort(self.devAddress)
+            thread.join(timeOut)
+            return None
+        return result[0]
+
+    def closeFailedPort(self):
+        """*Stops the reader and closes the port after a failed start*.
+
+        Only a port this device owns is closed, so a stale handle is opened
+        again on the next start instead of staying in the registry.
+        """
+        self.stopReader()
+        if serialRegistry.getPortOwner(self.devAddress) is self:
+            serialRegistry.closePort(self.devAddress)
+
     @abstractmethod
     def startSerial(self):
         """*Creates pySerial device*.
@@ -106,3 +393,241 @@ class serialDeviceSpec(ABC):
             All text read in, empty string if nothing
         """
         pass
+
+    ##########################################################################
+    # Background Reader Methods
+    ##########################################################################
+    def __initTransient__(self):
+        """*Creates (stopped) background reader state, empty write buffer*."""
+        self.txBuffer = bytearray()
+        self.rxThread = None
+        self.rxStop = threading.Event()
+        self.rxCondition = threading.Condition()
+        self.rxQueues = {}  # kind: deque of [arrivalNum, message]
+        self.rxCount = 0  # arrival counter, keeps kinds in received order
+
+    def startReader(self):
+        """*Starts a dedicated thread reading and sorting device messages*.
+
+        Returns
+        -------
+        [1, "Reader started"]
+            started succesfully
+        [0, "Reader already running"]
+            nothing to do
+        """
+        if self.isReaderRunning():
+            return [0, "Reader already running"]
+        self.rxStop.clear()
+        self.clearMessages()
+        self.rxThread = threading.Thread(target=self.__readerLoop__,
+                                         name=str(self.devAddress) + " reader",
+                                         daemon=True)
+        self.rxThread.start()
+        return [1, "Reader started"]
+
+    def stopReader(self):
+        """*Stops the background reader thread, waits for it to exit*.
+
+        Returns
+        -------
+        [1, "Reader stopped"]
+            stopped succesfully
+        [0, "Reader not running"]
+            nothing to do
+        """
+        if not self.isReaderRunning():
+            return [0, "Reader not running"]
+        self.rxStop.set()
+        if self.rxThread is not threading.current_thread():
+            self.rxThread.join()
+        self.rxThread = None
+        return [1, "Reader stopped"]
+
+    def isReaderRunning(self):
+        """*Returns whether the background reader thread is alive*.
+
+        Returns
+        -------
+        bool
+            True if reader thread is running
+        """
+        return self.rxThread is not None and self.rxThread.is_alive()
+
+    def __readerLoop__(self):
+        """*Reads messages until stopped and files them by kind*."""
+        while not self.rxStop.is_set():
+            try:
+                msg = self.readMessage()
+            except Exception as inst:
+                if not self.rxStop.is_set():
+                    print("\t\t\tBackground reader stopped on "
+                          + str(self.devAddress) + ": " + inst.__str__())
+                    logging.exception(inst)
+                break
+            if msg == "":
+                continue
+            self.queueMessage(msg)
+        # Wake up anyone still waiting so they see the reader has stopped
+        with self.rxCondition:
+            self.rxCondition.notify_all()
+
+    def queueMessage(self, msg):
+        """*Classifies msg, files it in its queue and wakes up waiters*.
+
+        Parameters
+        ----------
+        msg: String
+            message read in
+
+        Returns
+        -------
+        String
+            message kind
+        """
+        kind = self.classifyMessage(msg)
+        self.handleMessage(kind, msg)
+        with self.rxCondition:
+            if kind not in self.rxQueues:
+                self.rxQueues[kind] = deque(maxlen=self.rxQueueLength)
+            self.rxQueues[kind].append([self.rxCount, msg])
+            self.rxCount += 1
+            self.rxCondition.notify_all()
+        return kind
+
+    def popMessage(self, kinds=None):
+        """*Removes and returns the oldest queued message, does not wait*.
+
+        Parameters
+        ----------
+        kinds: list
+            message kinds to accept, None for all
+
+        Returns
+        -------
+        [kind, message]
+            oldest queued message of the requested kinds
+        [None, ""]
+            nothing queued
+        """
+        with self.rxCondition:
+            oldest = None
+            for kind, queue in self.rxQueues.items():
+                if queue and (kinds is None or kind in kinds):
+                    if oldest is None or queue[0][0] < oldest[1][0]:
+                        oldest = [kind, queue[0]]
+            if oldest is None:
+                return [None, ""]
+            self.rxQueues[oldest[0]].popleft()
+            return [oldest[0], oldest[1][1]]
+
+    def readMessage(self):
+        """*Reads one message from the port for the background reader*.
+
+        Blocks at most the port timeout. Override for devices whose replies
+        are not newline terminated.
+
+        Returns
+        -------
+        String
+            Message read in (stripped), empty string if nothing
+        """
+        return self.ser.readline().decode('utf-8', 'replace').strip()
+
+    def classifyMessage(self, msg):
+        """*Returns the kind of a message, used to sort it into a queue*.
+
+        Override to split device replies (e.g. "ok", "echo", "error").
+
+        Parameters
+        ----------
+        msg: String
+            message read in
+
+        Returns
+        -------
+        String
+            message kind
+        """
+        return 'other'
+
+    def handleMessage(self, kind, msg):
+        """*Called on the reader thread for every message before queueing*.
+
+        Override to keep state (e.g. cached position) up to date.
+
+        Parameters
+        ----------
+        kind: String
+            message kind from classifyMessage
+        msg: String
+            message read in
+        """
+        pass
+
+    def waitMessage(self, kinds=None, timeout=None):
+        """*Blocks until a message of one of kinds arrives or timeout*.
+
+        Messages are returned in the order they were received.
+
+        Parameters
+        ----------
+        kinds: list
+            message kinds to accept, None for all
+        timeout: float
+            seconds to wait, None to wait indefinitely
+
+        Returns
+        -------
+        [kind, message]
+            oldest queued message of the requested kinds
+        [None, ""]
+            timed out
+        """
+        self.flushWrites()  # a reply can't arrive for an unsent command
+        tStart = time.perf_counter()
+        if timeout is not None:
+            tEnd = tStart + timeout
+        with self.rxCondition:
+            while True:
+                result = self.popMessage(kinds)
+                if result[0] is not None or not self.isReaderRunning():
+                    break
+                if timeout is None:
+                    self.rxCondition.wait()
+                else:
+                    remaining = tEnd - time.perf_counter()
+                    if remaining <= 0:
+                        result = [None, ""]
+                        break
+                    self.rxCondition.wait(remaining)
+        self.recordWait(time.perf_counter() - tStart)
+        return result
+
+    def clearMessages(self, kinds=None):
+        """*Discards queued messages*.
+
+        Parameters
+        ----------
+        kinds: list
+            message kinds to discard, None for all
+        """
+        with self.rxCondition:
+            for kind, queue in self.rxQueues.items():
+                if kinds is None or kind in kinds:
+                    queue.clear()
+
+
+def loadLinkConfig():
+    """*Returns the saved link settings of all devices*.
+
+    Returns
+    -------
+    dict
+        devAddress: {'baudRate': int, ...}, empty if nothing saved
+    """
+    try:
+        with open(linkConfigPath, 'r') as linkFile:
+            return yaml.load(linkFile, Loader=yaml.Loader) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
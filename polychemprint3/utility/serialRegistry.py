@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Process-wide registry of open serial ports, keyed by devAddress.
+
+Drivers acquire their port here instead of opening it, and release it on
+deactivate without closing it. Re-activating a device (e.g. switching
+hardware in the menus) then reuses the open port, so boards that reset on
+open (Arduino based printers/tools) do not reboot every time.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+import atexit
+import threading
+import weakref
+import serial
+
+# devAddress: [serial.Serial, weakref to owning driver or None]
+openPorts = {}
+openPortsLock = threading.Lock()
+
+
+def acquirePort(owner, devAddress, **settings):
+    """*Returns the open port for devAddress, opening it if needed*.
+
+    Parameters
+    ----------
+    owner: serialDeviceSpec
+        driver taking ownership of the port
+    devAddress: String
+        location of serial device
+    settings
+        serial.Serial settings (baudrate, timeout, write_timeout...),
+        applied to the port if it is already open
+
+    Returns
+    -------
+    [serial.Serial, bool]
+        open port, True if it was newly opened (device may have reset)
+
+    Raises
+    ------
+    serial.SerialException
+        port owned by another active driver, or could not be opened
+    """
+    with openPortsLock:
+        entry = openPorts.get(devAddress)
+        if entry is not None:
+            [ser, ownerRef] = entry
+            current = ownerRef() if ownerRef is not None else None
+            if current is not None and current is not owner:
+                raise serial.SerialException(
+                    devAddress + " is in use by "
+                    + str(getattr(current, 'name', current)))
+            if ser.is_open:
+                try:
+                    ser.apply_settings(settings)
+                    ser.in_waiting  # fails on a stale handle
+                    entry[1] = weakref.ref(owner)
+                    return [ser, False]
+                except (serial.SerialException, OSError, ValueError):
+                    pass  # stale handle (device unplugged), opened again
+            openPorts.pop(devAddress)
+            try:
+                ser.close()
+            except (serial.SerialException, OSError):
+                pass
+        ser = serial.Serial(port=devAddress, **settings)
+        openPorts[devAddress] = [ser, weakref.ref(owner)]
+        return [ser, True]
+
+
+def releasePort(owner, devAddress):
+    """*Gives up ownership of a port, leaving it open for reuse*.
+
+    Parameters
+    ----------
+    owner: serialDeviceSpec
+        driver that acquired the port
+    devAddress: String
+        location of serial device
+
+    Returns
+    -------
+    [1, "Port released"]
+        released, port kept open
+    [0, "Port not owned"]
+        owner did not hold the port
+    """
+    with openPortsLock:
+        entry = openPorts.get(devAddress)
+        if entry is None or entry[1] is None or entry[1]() is not owner:
+            return [0, "Port not owned"]
+        entry[1] = None
+        return [1, "Port released"]
+
+
+def closePort(devAddress):
+    """*Closes a port and removes it from the registry*.
+
+    Parameters
+    ----------
+    devAddress: String
+        location of serial device
+
+    Returns
+    -------
+    [1, "Port closed"]
+        closed
+    [0, "Port not open"]
+        nothing to do
+    """
+    with openPortsLock:
+        entry = openPorts.pop(devAddress, None)
+    if entry is None:
+        return [0, "Port not open"]
+    try:
+        entry[0].close()
+    except (serial.SerialException, OSError):
+        pass  # stale handle (device unplugged), nothing left to close
+    return [1, "Port closed"]
+
+
+def closeAllPorts():
+    """*Closes every registered port (on exit)*."""
+    for devAddress in list(openPorts):
+        closePort(devAddress)
+
+
+def getPortOwner(devAddress):
+    """*Returns the driver owning devAddress*.
+
+    Parameters
+    ----------
+    devAddress: String
+        location of serial device
+
+    Returns
+    -------
+    serialDeviceSpec
+        owning driver, None if the port is free or not open
+    """
+    with openPortsLock:
+        entry = openPorts.get(devAddress)
+        if entry is None or entry[1] is None:
+            return None
+        return entry[1]()
+
+
+atexit.register(closeAllPorts)
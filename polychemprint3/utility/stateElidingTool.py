@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Contains stateElidingTool, a toolSpec wrapper skipping redundant commands.
+
+Generated sequences often set a tool to the value/engage state it is
+already in, each of which is a full serial transaction. The wrapper
+remembers what the tool last confirmed and only forwards commands that
+change it. Everything else is passed through to the wrapped tool.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+
+
+class stateElidingTool:
+    """Wraps a toolSpec, skipping setValue/engage/disengage calls that would
+    not change the confirmed tool state."""
+
+    def __init__(self, tool):
+        """*Initializes wrapper with unknown tool state*.
+
+        Parameters
+        ----------
+        tool: toolSpec
+            active tool to forward commands to
+        """
+        self.tool = tool
+        self.stats = {'sent': 0, 'skipped': 0}
+        self.invalidate()
+
+    def __getattr__(self, name):
+        """*Forwards any other attribute to the wrapped tool*."""
+        if name == 'tool':  # not set yet (copying)
+            raise AttributeError(name)
+        return getattr(self.tool, name)
+
+    # State Tracking Methods #################################################
+    def invalidate(self):
+        """*Forgets the tracked state, next commands are all sent*.
+
+        To be called after the tool may have been changed outside this
+        wrapper (e.g. by the operator on the front panel).
+        """
+        self.engaged = None  # True/False once confirmed, None if unknown
+        self.value = None  # last confirmed value, None if unknown
+
+    def resync(self):
+        """*Forgets the tracked value, reads engage state back from the tool*.
+
+        Returns
+        -------
+        status : two-element list
+            result of the tool's getState
+        """
+        self.invalidate()
+        status = self.tool.getState()
+        if status[0] in (0, 1):
+            self.engaged = status[0] == 1
+        return status
+
+    def valueKey(self, value):
+        """*Returns value in comparable form ("30" and "30.0" are equal)*.
+
+        Parameters
+        ----------
+        value: String
+            tool value as passed to setValue
+
+        Returns
+        -------
+        float or String
+            numeric value if it parses, else the string
+        """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return str(value)
+
+    def recordEngage(self, doEngage, status):
+        """*Updates engage state from the tool's reply*.
+
+        Parameters
+        ----------
+        doEngage: bool
+            whether engage (True) or disengage (False) was sent
+        status : two-element list
+            reply of engage/disengage, 1 done, 0 already in that state
+        """
+        self.stats['sent'] += 1
+        self.engaged = doEngage if status and status[0] in (0, 1) else None
+
+    def recordValue(self, key, status):
+        """*Updates value from the tool's reply*.
+
+        Parameters
+        ----------
+        key: float or String
+            valueKey of the value sent
+        status : two-element list
+            reply of setValue, 1 if set
+        """
+        self.stats['sent'] += 1
+        self.value = key if status and status[0] == 1 else None
+
+    # Tool Action (Dispensing) Methods #######################################
+    def engage(self):
+        """Turn tool primary action on, unless confirmed on already.
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.engage, [0, ...] if skipped
+        """
+        if self.engaged is True:
+            self.stats['skipped'] += 1
+            return [0, "Skipped: tool already engaged."]
+        status = self.tool.engage()
+        self.recordEngage(True, status)
+        return status
+
+    def disengage(self):
+        """Turn tool primary action off, unless confirmed off already.
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.disengage, [0, ...] if skipped
+        """
+        if self.engaged is False:
+            self.stats['skipped'] += 1
+            return [0, "Skipped: tool already disengaged."]
+        status = self.tool.disengage()
+        self.recordEngage(False, status)
+        return status
+
+    def setValue(self, value):
+        """Set the primary tool action value, unless already set to it.
+
+        Parameters
+        ----------
+        value: String
+            The new value of the parameter as a string.
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.setValue, [1, ...] if skipped
+        """
+        key = self.valueKey(value)
+        if self.value is not None and key == self.value:
+            self.stats['skipped'] += 1
+            return [1, "Skipped: value already " + str(value)]
+        status = self.tool.setValue(value)
+        self.recordValue(key, status)
+        return status
+
+    def expose(self, seconds):
+        """Turn tool primary action on for a set time, then off.
+
+        Parameters
+        ----------
+        seconds: float
+            how long the tool should be on
+
+        Returns
+        -------
+        status : two-element list
+            Same as toolSpec.expose
+        """
+        status = self.tool.expose(seconds)
+        self.recordEngage(False, status)
+        return status
+
+    def submitBatch(self, actions):
+        """Queues a list of timed tool actions, forgetting the tracked state.
+
+        Parameters
+        ----------
+        actions: list
+            [seconds, action, args...] entries, see toolSpec.submitBatch
+
+        Returns
+        -------
+        concurrent.futures.Future
+            Same as toolSpec.submitBatch
+        """
+        self.invalidate()
+        return self.tool.submitBatch(actions)
+
+    def runBatch(self, actions):
+        """Runs a list of timed tool actions, forgetting the tracked state.
+
+        Parameters
+        ----------
+        actions: list
+            [seconds, action, args...] entries, see toolSpec.submitBatch
+
+        Returns
+        -------
+        list
+            Same as toolSpec.runBatch
+        """
+        self.invalidate()
+        return self.tool.runBatch(actions)
+
+    async def engageAsync(self):
+        """Coroutine version of engage.
+
+        Returns
+        -------
+        status : two-element list
+            Same as engage
+        """
+        if self.engaged is True:
+            self.stats['skipped'] += 1
+            return [0, "Skipped: tool already engaged."]
+        status = await self.tool.engageAsync()
+        self.recordEngage(True, status)
+        return status
+
+    async def disengageAsync(self):
+        """Coroutine version of disengage.
+
+        Returns
+        -------
+        status : two-element list
+            Same as disengage
+        """
+        if self.engaged is False:
+            self.stats['skipped'] += 1
+            return [0, "Skipped: tool already disengaged."]
+        status = await self.tool.disengageAsync()
+        self.recordEngage(False, status)
+        return status
+
+    async def setValueAsync(self, value):
+        """Coroutine version of setValue.
+
+        Parameters
+        ----------
+        value: String
+            The new value of the parameter as a string.
+
+        Returns
+        -------
+        status : two-element list
+            Same as setValue
+        """
+        key = self.valueKey(value)
+        if self.value is not None and key == self.value:
+            self.stats['skipped'] += 1
+            return [1, "Skipped: value already " + str(value)]
+        status = await self.tool.setValueAsync(value)
+        self.recordValue(key, status)
+        return status
+
+    async def exposeAsync(self, seconds):
+        """Coroutine version of expose.
+
+        Parameters
+        ----------
+        seconds: float
+            how long the tool should be on
+
+        Returns
+        -------
+        status : two-element list
+            Same as expose
+        """
+        status = await self.tool.exposeAsync(seconds)
+        self.recordEngage(False, status)
+        return status
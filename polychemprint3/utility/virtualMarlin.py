@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""Simulated Marlin printer on a pseudo-terminal, for offline testing.
+
+Point an axes object's devAddress at virtualMarlin.start() and the real
+serial driver code runs against it. Only POSIX systems provide PTYs.
+
+| First created on 18/10/2026
+| Revised:
+| Author: Bijal Patel
+
+"""
+import math
+import os
+import re
+import select
+import threading
+import time
+import tty
+
+
+class virtualMarlin:
+    """PTY device speaking the subset of Marlin used by lulzbotTaz6_BP."""
+
+    def __init__(self, firmwareVers='BP', ackLatency=0.0, plannerDepth=16,
+                 lineRate=None, rxBufferSize=128, timeScale=0.0,
+                 rejectEvery=0, __verbose__=0):
+        """*Initializes virtual printer, does not start it*.
+
+        Parameters
+        ----------
+        firmwareVers: String
+            text included in the M115 firmware string
+        ackLatency: float
+            seconds between a command being processed and its "ok"
+        plannerDepth: int
+            number of moves the planner queue holds before "ok"s stall
+        lineRate: float
+            max commands processed per second, None for no cap
+        rxBufferSize: int
+            bytes of unprocessed input held, excess input is dropped
+        timeScale: float
+            multiplier on real move durations (0 executes moves instantly)
+        rejectEvery: int
+            if > 0, every rejectEvery-th numbered line fails its checksum
+        __verbose__: bool
+            whether received commands are printed
+        """
+        self.firmwareVers = firmwareVers
+        self.ackLatency = ackLatency
+        self.plannerDepth = plannerDepth
+        self.lineRate = lineRate
+        self.rxBufferSize = rxBufferSize
+        self.timeScale = timeScale
+        self.rejectEvery = rejectEvery
+        self.__verbose__ = __verbose__
+
+        self.posMode = 'absolute'
+        self.pos = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'E': 0.0}
+        self.feedRate = 3000.0  # mm/min
+        self.temperature = {'T': [25.0, 0.0], 'B': [25.0, 0.0]}
+        self.autoReport = {'M154': 0, 'M155': 0}  # seconds, 0 is off
+        self.lastLine = 0
+        self.lastRejected = 0  # rejectEvery fails each line number once
+        self.flushInput = False  # set by requestResend, see __serve__
+        self.stats = {}
+
+        self.masterFd = None
+        self.slaveFd = None
+        self.thread = None
+        self.stopEvent = threading.Event()
+
+    ##########################################################################
+    # Control Methods
+    ##########################################################################
+    def start(self):
+        """*Opens the pseudo-terminal and starts serving it, resets state*.
+
+        Returns
+        -------
+        String
+            device path to use as devAddress
+        """
+        self.posMode = 'absolute'
+        self.pos = {'X': 0.0, 'Y': 0.0, 'Z': 0.0, 'E': 0.0}
+        self.feedRate = 3000.0
+        self.lastLine = 0
+        self.lastRejected = 0
+        self.flushInput = False
+        self.stats = {'commands': 0, 'moves': 0, 'rejected': 0,
+                      'overflowBytes': 0}
+        self.masterFd, self.slaveFd = os.openpty()
+        tty.setraw(self.slaveFd)  # no echo/line editing on the device side
+        self.stopEvent.clear()
+        self.thread = threading.Thread(target=self.__serve__,
+                                       name="virtualMarlin", daemon=True)
+        self.thread.start()
+        return os.ttyname(self.slaveFd)
+
+    def stop(self):
+        """*Stops serving and closes the pseudo-terminal*."""
+        self.stopEvent.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for fd in [self.masterFd, self.slaveFd]:
+            if fd is not None:
+                os.close(fd)
+        self.masterFd = None
+        self.slaveFd = None
+
+    ##########################################################################
+    # Serving Methods
+    ##########################################################################
+    def __serve__(self):
+        """*Event loop: reads input, processes lines, sends replies*."""
+        rxBuffer = b''
+        outQueue = []  # [sendTime, bytes], in send order
+        planner = []  # finish times of queued moves
+        nextLineTime = 0.0
+        waitEmpty = False  # M400 in progress
+        nextReport = {'M154': 0.0, 'M155': 0.0}
+
+        while not self.stopEvent.is_set():
+            now = time.time()
+            planner = [tDone for tDone in planner if tDone > now]
+
+            # M400 is answered once the planner has emptied
+            if waitEmpty and not planner:
+                waitEmpty = False
+                outQueue.append([now + self.ackLatency, b'ok\n'])
+                continue
+
+            # Process the next complete line if planner and rate allow
+            if (b'\n' in rxBuffer and now >= nextLineTime
+                    and len(planner) < self.plannerDepth and not waitEmpty):
+                line, rxBuffer = rxBuffer.split(b'\n', 1)
+                replies, moveTime, waitEmpty = self.processLine(
+                    line.decode('utf-8', 'replace').strip())
+                # Like Marlin, input received before a resend request is
+                # dropped, the host resends it
+                if self.flushInput:
+                    self.flushInput = False
+                    rxBuffer = b''
+                if moveTime is not None:
+                    start = planner[-1] if planner else now
+                    planner.append(max(start, now) + moveTime)
+                for reply in replies:
+                    outQueue.append([now + self.ackLatency,
+                                     reply.encode('utf-8')])
+                if self.lineRate:
+                    nextLineTime = now + 1.0 / self.lineRate
+                continue
+
+            # Auto-reports (M154/M155)
+            for code, interval in self.autoReport.items():
+                if interval > 0 and now >= nextReport[code]:
+                    if code == 'M154':
+                        report = self.positionReport(counts=False)
+                    else:
+                        report = self.temperatureReport()
+                    outQueue.append([now, report.encode('utf-8')])
+                    nextReport[code] = now + interval
+
+            # Send replies that are due
+            while outQueue and outQueue[0][0] <= now:
+                os.write(self.masterFd, outQueue.pop(0)[1])
+
+            # Sleep until input or the next scheduled event
+            events = [t for t in [nextLineTime] if t > now]
+            if outQueue:
+                events.append(outQueue[0][0])
+            for code, interval in self.autoReport.items():
+                if interval > 0:
+                    events.append(nextReport[code])
+            if planner and (len(planner) >= self.plannerDepth or waitEmpty):
+                events.append(planner[0])
+            timeout = max(0.0, min(events) - now) if events else 0.05
+            ready = select.select([self.masterFd], [], [],
+                                  min(timeout, 0.05))[0]
+            if ready:
+                try:
+                    data = os.read(self.masterFd, 4096)
+                except OSError:
+                    break
+                room = self.rxBufferSize - len(rxBuffer)
+                if len(data) > room:
+                    self.stats['overflowBytes'] += len(data) - room
+                    data = data[:max(room, 0)]
+                rxBuffer += data
+
+    def processLine(self, line):
+        """*Executes one received line, returns replies and planner effect*.
+
+        Parameters
+        ----------
+        line: String
+            received line without newline
+
+        Returns
+        -------
+        [list, float, bool]
+            reply lines, move duration (None if not a move), whether the
+            "ok" must wait for the planner to empty (M400)
+        """
+        if self.__verbose__:
+            print("\t\t\tvirtualMarlin Rcvd: " + line)
+        line = line.split(';')[0].strip()
+        if line == "":
+            return [[], None, False]
+
+        # Line number and checksum
+        numbered = re.match(r'N(\d+)\s+(.*?)\*(\d+)$', line)
+        if numbered:
+            lineNum = int(numbered.group(1))
+            checkTotal = 0
+            for byte in line[:line.rindex('*')].encode('utf-8'):
+                checkTotal ^= byte
+            if (checkTotal != int(numbered.group(3))
+                    or (self.rejectEvery > 0
+                        and lineNum % self.rejectEvery == 0
+                        and lineNum > self.lastRejected)):
+                self.lastRejected = lineNum
+                self.stats['rejected'] += 1
+                return [self.requestResend("checksum mismatch"), None, False]
+            if lineNum != self.lastLine + 1 and 'M110' not in line:
+                return [self.requestResend(
+                    "Line Number is not Last Line Number+1"), None, False]
+            self.lastLine = lineNum
+            line = numbered.group(2).strip()
+
+        self.stats['commands'] += 1
+        words = line.split()
+        cmd = words[0].upper()
+        args = {}
+        for word in words[1:]:
+            try:
+                args[word[0].upper()] = float(word[1:])
+            except ValueError:
+                pass
+
+        replies = []
+        moveTime = None
+        waitEmpty = False
+        if cmd in ['G0', 'G1']:
+            moveTime = self.move(args)
+        elif cmd == 'G90':
+            self.posMode = 'absolute'
+        elif cmd == 'G91':
+            self.posMode = 'relative'
+        elif cmd == 'G92':
+            for axis in self.pos:
+                if axis in args or len(args) == 0:
+                    self.pos[axis] = args.get(axis, 0.0)
+        elif cmd == 'M110':
+            self.lastLine = int(args.get('N', 0))
+        elif cmd == 'M114':
+            replies.append(self.positionReport())
+        elif cmd == 'M115':
+            replies.append("FIRMWARE_NAME:Marlin virtual " + self.firmwareVers
+                           + " PROTOCOL_VERSION:1.0 MACHINE_TYPE:virtualMarlin"
+                           + " EXTRUDER_COUNT:1\n")
+        elif cmd in ['M154', 'M155']:
+            self.autoReport[cmd] = args.get('S', 0)
+        elif cmd == 'M400':
+            waitEmpty = True
+        else:
+            replies.append("echo:Unknown command: \"" + line + "\"\n")
+        if not waitEmpty:
+            replies.append("ok\n")
+        return [replies, moveTime, waitEmpty]
+
+    def move(self, args):
+        """*Updates position for a G0/G1 move, returns its duration*.
+
+        Parameters
+        ----------
+        args: dict
+            axis letter: value parsed from the command
+
+        Returns
+        -------
+        float
+            seconds the move occupies the planner
+        """
+        self.stats['moves'] += 1
+        if 'F' in args and args['F'] > 0:
+            self.feedRate = args['F']
+        dist = 0.0
+        for axis in self.pos:
+            if axis in args:
+                if self.posMode == 'relative':
+                    delta = args[axis]
+                else:
+                    delta = args[axis] - self.pos[axis]
+                self.pos[axis] += delta
+                if axis != 'E':
+                    dist += delta ** 2
+        return self.timeScale * math.sqrt(dist) / (self.feedRate / 60.0)
+
+    def positionReport(self, counts=True):
+        """*Returns an M114 style position line*.
+
+        Parameters
+        ----------
+        counts: bool
+            whether stepper counts are included (M114), M154 leaves them out
+
+        Returns
+        -------
+        String
+            "X:.. Y:.. Z:.. E:.. Count X:.. Y:.. Z:.." with newline
+        """
+        report = ("X:%.2f Y:%.2f Z:%.2f E:%.2f"
+                  % (self.pos['X'], self.pos['Y'], self.pos['Z'],
+                     self.pos['E']))
+        if counts:
+            report += (" Count X:%d Y:%d Z:%d"
+                       % (self.pos['X'] * 100, self.pos['Y'] * 100,
+                          self.pos['Z'] * 400))
+        return report + "\n"
+
+    def temperatureReport(self):
+        """*Returns an M105/M155 style temperature line*.
+
+        Returns
+        -------
+        String
+            "T:.. /.. B:.. /.. @:0 B@:0" with newline
+        """
+        return ("T:%.2f /%.2f B:%.2f /%.2f @:0 B@:0\n"
+                % (self.temperature['T'][0], self.temperature['T'][1],
+                   self.temperature['B'][0], self.temperature['B'][1]))
+
+    def requestResend(self, errorText):
+        """*Returns Marlin's reply to a bad line, flags the input flush*.
+
+        Parameters
+        ----------
+        errorText: String
+            reason for rejecting the line
+
+        Returns
+        -------
+        list
+            error, resend request and "ok" lines
+        """
+        self.flushInput = True
+        return ["Error:" + errorText + ", Last Line: " + str(self.lastLine)
+                + "\n", "Resend: " + str(self.lastLine + 1) + "\n", "ok\n"]